@@ -4,19 +4,356 @@ import torch.nn as nn
 from transformers import AutoTokenizer, AutoModel
 from sklearn.feature_extraction.text import TfidfVectorizer
 import re
+import os
+import hashlib
+import contextlib
+import copy
+import fcntl
+import threading
+import time
+from collections import OrderedDict
 import librosa
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 import json
 
+from analyzer.audio_analyzer.audio_buffer import AudioBuffer
+from analyzer.audio_analyzer.pitch import get_pitch_estimator
+from analyzer.audio_analyzer.spectral_context import SpectralContext
+
+class EmbeddingCache:
+    """Content-addressed cache for transcript embeddings.
+    
+    Entries are keyed by a SHA-256 of the normalized transcript. The memory tier
+    is an LRU bounded in bytes; the optional disk tier is an append-only file of
+    fixed-size records that is memory-mapped, so it survives restarts.
+    
+    Several caches (in one process or many) may share a disk file. Appends take
+    an exclusive flock on a sidecar lock file and record each entry at the row
+    its bytes actually landed on, and records appended by other writers are
+    indexed on the next miss. When the file would grow past max_disk_bytes it is
+    atomically replaced by an empty one, so existing maps stay valid.
+    """
+    
+    KEY_SIZE = 32
+    
+    # One cache per (disk file, dim, namespace) in this process, see shared()
+    _shared = {}
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_path: Optional[str] = None, dim: int = 768,
+                 namespace: str = '', max_disk_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.dim = dim
+        self.disk_path = disk_path
+        self.namespace = namespace
+        if max_disk_bytes is None:
+            max_disk_bytes = int(os.environ.get('BERT_EMBEDDING_CACHE_MAX_DISK_BYTES', 1024 * 1024 * 1024))
+        self.max_disk_bytes = max_disk_bytes
+        
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_resets': 0}
+        
+        # Disk tier: one record per embedding, looked up through an in-memory index
+        # of the first _disk_rows records of the file with inode _disk_inode
+        self._record_dtype = np.dtype([('key', 'S%d' % self.KEY_SIZE), ('embedding', '<f4', (dim,))])
+        self._disk = np.zeros(0, dtype=self._record_dtype)
+        self._disk_index = {}
+        self._disk_rows = 0
+        self._disk_inode = None
+        if disk_path:
+            self._open_disk()
+    
+    @classmethod
+    def shared(cls, disk_path: Optional[str] = None, dim: int = 768, namespace: str = '', **kwargs) -> 'EmbeddingCache':
+        """The process-wide cache for a disk file (a private cache when there is no disk tier)"""
+        if not disk_path:
+            return cls(disk_path=None, dim=dim, namespace=namespace, **kwargs)
+        key = (os.path.realpath(disk_path), dim, namespace)
+        with cls._shared_lock:
+            cache = cls._shared.get(key)
+            if cache is None:
+                cache = cls._shared[key] = cls(disk_path=disk_path, dim=dim, namespace=namespace, **kwargs)
+            return cache
+    
+    def make_key(self, text: str) -> bytes:
+        """Hash the normalized transcript (case and whitespace insensitive)"""
+        normalized = ' '.join(text.lower().split())
+        return hashlib.sha256((self.namespace + '\x00' + normalized).encode('utf-8')).digest()
+    
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Return the cached embedding for key, or None on a miss"""
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return embedding
+            
+            if self.disk_path:
+                row = self._disk_index.get(key)
+                if row is None or row >= self._disk_rows:
+                    # Pick up records appended since the last sync (by us or another writer)
+                    self._sync_disk_if_changed()
+                    row = self._disk_index.get(key)
+                if row is not None:
+                    embedding = np.array(self._disk[row]['embedding'])
+                    self._store_in_memory(key, embedding)
+                    self.stats['disk_hits'] += 1
+                    return embedding
+            
+            self.stats['misses'] += 1
+            return None
+    
+    def put(self, key: bytes, embedding: np.ndarray):
+        """Store an embedding in the memory tier and, if enabled, on disk"""
+        embedding = np.array(embedding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._store_in_memory(key, embedding)
+            if not self.disk_path or key in self._disk_index:
+                return
+            record = np.zeros(1, dtype=self._record_dtype)
+            record['key'] = key
+            record['embedding'] = embedding
+            size = self._record_dtype.itemsize
+            with self._file_lock():
+                self._sync_disk()
+                if key in self._disk_index:
+                    return
+                if self.max_disk_bytes and (self._disk_rows + 1) * size > self.max_disk_bytes:
+                    self._reset_disk()
+                with open(self.disk_path, 'ab') as f:
+                    end = f.seek(0, os.SEEK_END)
+                    if end % size:
+                        # A writer died mid-append: drop its torn record so rows stay aligned
+                        end -= end % size
+                        f.truncate(end)
+                    f.write(record.tobytes())
+                self._disk_index[key] = end // size
+    
+    def get_stats(self) -> Dict:
+        """Counters and sizes for monitoring"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['disk_hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': (self.stats['hits'] + self.stats['disk_hits']) / lookups if lookups else 0.0,
+                'entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'max_bytes': self.max_bytes,
+                'disk_entries': len(self._disk_index),
+                'max_disk_bytes': self.max_disk_bytes,
+                'disk_path': self.disk_path
+            }
+    
+    def _store_in_memory(self, key: bytes, embedding: np.ndarray):
+        """Insert into the LRU and evict the oldest entries past the byte limit"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = embedding
+        self._memory_bytes += embedding.nbytes
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.stats['evictions'] += 1
+    
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """Exclusive flock shared by every writer of the disk file"""
+        with open(self.disk_path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _open_disk(self):
+        """Trim a torn trailing record, then map the disk file and index its keys"""
+        directory = os.path.dirname(self.disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._file_lock():
+            if os.path.exists(self.disk_path):
+                size = os.path.getsize(self.disk_path)
+                if size % self._record_dtype.itemsize:
+                    os.truncate(self.disk_path, size - size % self._record_dtype.itemsize)
+            self._sync_disk()
+    
+    def _sync_disk_if_changed(self):
+        """_sync_disk, if the file was appended to or replaced since the last sync"""
+        try:
+            stat = os.stat(self.disk_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._disk_inode or stat.st_size // self._record_dtype.itemsize != self._disk_rows:
+            with self._file_lock():
+                self._sync_disk()
+    
+    def _sync_disk(self):
+        """Remap the disk file and index the records added since the last sync (call under _file_lock)"""
+        try:
+            stat = os.stat(self.disk_path)
+        except FileNotFoundError:
+            stat = None
+        inode = stat.st_ino if stat else None
+        count = stat.st_size // self._record_dtype.itemsize if stat else 0
+        if inode != self._disk_inode or count < self._disk_rows:
+            # The file was reset (replaced): its rows start over
+            self._disk_index = {}
+            self._disk_rows = 0
+            self._disk_inode = inode
+        if count == 0:
+            self._disk = np.zeros(0, dtype=self._record_dtype)
+        elif count != self._disk_rows:
+            self._disk = np.memmap(self.disk_path, dtype=self._record_dtype, mode='r', shape=(count,))
+        # 'S' fields drop trailing NUL bytes, which keys may end with
+        for row, key in enumerate(self._disk['key'][self._disk_rows:count], self._disk_rows):
+            self._disk_index.setdefault(bytes(key).ljust(self.KEY_SIZE, b'\x00'), row)
+        self._disk_rows = count
+    
+    def _reset_disk(self):
+        """Start the disk tier over with an empty file (call under _file_lock)"""
+        temporary = self.disk_path + '.tmp'
+        open(temporary, 'wb').close()
+        # Replaced rather than truncated, so maps other processes hold stay valid
+        os.replace(temporary, self.disk_path)
+        self.stats['disk_resets'] += 1
+        self._sync_disk()
+
+
+class KeywordMatcher:
+    """Per-category keyword counter built once from the fraud keyword lists.
+    
+    Each distinct keyword is searched exactly once per text with str.count (a C
+    substring search), and its count is credited to every category listing it.
+    Keywords are checked shortest first: a keyword containing another keyword
+    that did not occur cannot occur either, so it is skipped without a scan.
+    """
+    
+    def __init__(self, keywords_by_category: Dict[str, List[str]]):
+        self.categories = list(keywords_by_category)
+        
+        # keyword -> categories that list it
+        self._owners = {}
+        for category, keywords in keywords_by_category.items():
+            for keyword in keywords:
+                self._owners.setdefault(keyword, []).append(category)
+        
+        # Shortest first, each with the shorter keywords it contains
+        self._keywords = sorted(self._owners, key=len)
+        self._contained = {
+            keyword: [other for other in self._keywords if len(other) < len(keyword) and other in keyword]
+            for keyword in self._keywords
+        }
+        self.max_keyword_length = max(len(keyword) for keyword in self._keywords)
+    
+    def count(self, text_lower: str) -> Dict[str, int]:
+        """Total keyword occurrences per category in already lower-cased text"""
+        counts = {category: 0 for category in self.categories}
+        found = {}
+        for keyword in self._keywords:
+            if any(found[other] == 0 for other in self._contained[keyword]):
+                found[keyword] = 0
+                continue
+            found[keyword] = text_lower.count(keyword)
+            if found[keyword]:
+                for category in self._owners[keyword]:
+                    counts[category] += found[keyword]
+        return counts
+
+
+class ScamPatternMatcher:
+    """Scam patterns compiled once, with bounded gaps between anchors.
+    
+    Patterns are written as 'a.*b.*c'. Each anchor must start at a word boundary
+    and may end inside a word ('pay' matches 'payment'), and at most
+    max_gap_words whole words may separate consecutive anchors. Unlike '.*',
+    which backtracks quadratically on long transcripts, every gap has a fixed
+    number of alternatives, so each search is linear in the text length.
+    """
+    
+    def __init__(self, patterns: List[str], max_gap_words: int = 8):
+        self.patterns = list(patterns)
+        self.max_gap_words = max_gap_words
+        
+        gap = r'\w*(?:\W+\w+){0,%d}?\W+' % max_gap_words
+        anchors = [pattern.split('.*') for pattern in self.patterns]
+        self._compiled = [re.compile(self._compile_source(parts, gap)) for parts in anchors]
+        
+        # Most words a single match can span; older text can never start a new match
+        self.max_span_words = max(
+            len(' '.join(parts).split()) + (len(parts) - 1) * max_gap_words for parts in anchors
+        )
+    
+    @staticmethod
+    def _compile_source(anchors: List[str], gap: str) -> str:
+        """Regex source for one pattern: anchors joined by bounded gaps.
+        
+        The word-boundary check for the first anchor is a lookbehind placed after
+        it, so the pattern still starts with a literal and re can use its fast
+        prefix scan to skip text that cannot match.
+        """
+        first = re.escape(anchors[0]) + r'(?<!\w[\s\S]{%d})' % len(anchors[0])
+        return gap.join([first] + [re.escape(anchor) for anchor in anchors[1:]])
+    
+    def match(self, text_lower: str, exclude=()) -> List[str]:
+        """Patterns (in declaration order) that fire on already lower-cased text"""
+        return [
+            pattern for pattern, compiled in zip(self.patterns, self._compiled)
+            if pattern not in exclude and compiled.search(text_lower)
+        ]
+    
+    def tail(self, text_lower: str) -> str:
+        """Suffix of text that could still begin a match once more text is appended"""
+        starts = [m.start() for m in re.finditer(r'\S+', text_lower)]
+        if len(starts) <= self.max_span_words:
+            return text_lower
+        return text_lower[starts[-self.max_span_words]:]
+
+
 class BERTTextAnalyzer:
     """Advanced BERT-based text analysis for fraud detection"""
     
-    def __init__(self):
+    BACKENDS = ('fp32', 'int8')
+    
+    MAX_LENGTH = 512
+    
+    def __init__(self, cache_max_bytes: int = 64 * 1024 * 1024, cache_path: Optional[str] = None,
+                 backend: Optional[str] = None, sliding_window: Optional[bool] = None,
+                 window_stride: int = 384, max_windows_per_batch: int = 8):
         # Load pre-trained BERT model for text classification
         self.tokenizer = AutoTokenizer.from_pretrained('bert-base-uncased')
         self.model = AutoModel.from_pretrained('bert-base-uncased')
         self.model.eval()
         
+        # Inference backend: fp32 (default) or int8 dynamic quantization for CPU nodes
+        self.backend = (backend or os.environ.get('BERT_BACKEND', 'fp32')).lower()
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"Unknown BERT backend '{self.backend}', expected one of {self.BACKENDS}")
+        if self.backend == 'int8':
+            self.model = torch.quantization.quantize_dynamic(self.model, {nn.Linear}, dtype=torch.qint8)
+        
+        # Long transcripts: truncate at MAX_LENGTH tokens, or encode overlapping windows
+        if sliding_window is None:
+            sliding_window = os.environ.get('BERT_SLIDING_WINDOW', '').lower() in ('1', 'true', 'yes')
+        self.sliding_window = sliding_window
+        self.window_size = self.MAX_LENGTH - self.tokenizer.num_special_tokens_to_add()
+        if not 0 < window_stride <= self.window_size:
+            raise ValueError(f"window_stride must be between 1 and {self.window_size}")
+        self.window_stride = window_stride
+        self.max_windows_per_batch = max_windows_per_batch
+        
+        # Embedding cache so repeated scripts are only encoded once (per backend and mode),
+        # one object per disk file shared by every analyzer in the process
+        self.embedding_cache = EmbeddingCache.shared(
+            max_bytes=cache_max_bytes,
+            disk_path=cache_path or os.environ.get('BERT_EMBEDDING_CACHE_PATH'),
+            dim=self.model.config.hidden_size,
+            namespace=f"{self.backend}:{'window' if self.sliding_window else 'truncate'}"
+        )
+        
         # Fraud-specific keywords and patterns
         self.fraud_keywords = {
             'urgency': ['immediately', 'urgent', 'right now', 'hurry', 'act fast', 'limited time'],
@@ -26,6 +363,7 @@ class BERTTextAnalyzer:
             'threats': ['sued', 'arrested', 'jail', 'prosecuted', 'legal action', 'consequences'],
             'rewards': ['prize', 'winner', 'lottery', 'free', 'grant', 'inheritance', 'bonus']
         }
+        self.keyword_matcher = KeywordMatcher(self.fraud_keywords)
         
         # Scam pattern indicators
         self.scam_patterns = [
@@ -37,26 +375,141 @@ class BERTTextAnalyzer:
             r'do not.*tell.*anyone',
             r'act.*now.*or.*lose'
         ]
+        self.pattern_matcher = ScamPatternMatcher(self.scam_patterns)
     
     def analyze_text(self, text: str) -> Dict:
         """Analyze text for fraud indicators using BERT and rule-based methods"""
+        return self.analyze_texts([text])[0]
+    
+    def analyze_texts(self, texts: List[str], batch_size: int = 16) -> List[Dict]:
+        """Analyze many texts at once, returning one result per text in input order"""
+        if not texts:
+            return []
         
-        # BERT-based semantic analysis
-        inputs = self.tokenizer(text, return_tensors='pt', truncation=True, max_length=512)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            embeddings = outputs.last_hidden_state.mean(dim=1).numpy()
+        # BERT-based semantic analysis (one forward pass per length bucket)
+        embeddings = self._encode_texts(texts, batch_size)
+        
+        return [self._build_text_result(text, embedding) for text, embedding in zip(texts, embeddings)]
+    
+    def start_session(self) -> 'IncrementalTextAnalyzer':
+        """Create a stateful analyzer for a live transcript that grows chunk by chunk"""
+        return IncrementalTextAnalyzer(self)
+    
+    def _encode_texts(self, texts: List[str], batch_size: int) -> List[np.ndarray]:
+        """Encode texts with BERT, serving repeated transcripts from the embedding cache"""
+        keys = [self.embedding_cache.make_key(text) for text in texts]
+        embeddings = [None] * len(texts)
+        
+        # Look up each distinct transcript once; collect the misses for BERT
+        pending = {}
+        for index, key in enumerate(keys):
+            if key in pending:
+                pending[key].append(index)
+                continue
+            cached = self.embedding_cache.get(key)
+            if cached is not None:
+                embeddings[index] = cached.reshape(1, -1)
+            else:
+                pending[key] = [index]
+        
+        if pending:
+            miss_keys = list(pending)
+            encoded = self._run_bert([texts[pending[key][0]] for key in miss_keys], batch_size)
+            for key, embedding in zip(miss_keys, encoded):
+                self.embedding_cache.put(key, embedding)
+                for index in pending[key]:
+                    embeddings[index] = embedding
+        
+        return embeddings
+    
+    def _run_bert(self, texts: List[str], batch_size: int) -> List[np.ndarray]:
+        """Run BERT over texts, truncating or windowing long transcripts"""
+        if not self.sliding_window:
+            encoded = self.tokenizer(list(texts), truncation=True, max_length=self.MAX_LENGTH)
+            items = [{key: encoded[key][i] for key in encoded.keys()} for i in range(len(texts))]
+            pooled, _ = self._encode_items(items, batch_size)
+            return [pooled[i:i + 1] for i in range(len(texts))]
+        
+        # Split every transcript into overlapping windows and encode them all together
+        token_ids = self.tokenizer(list(texts), add_special_tokens=False)['input_ids']
+        items, owners = [], []
+        for owner, tokens in enumerate(token_ids):
+            for window in self._split_windows(tokens):
+                items.append(self._window_item(window))
+                owners.append(owner)
+        
+        pooled, token_counts = self._encode_items(items, min(batch_size, self.max_windows_per_batch))
+        
+        # Pool windows into one call-level embedding, weighted by tokens per window
+        owners = np.array(owners)
+        embeddings = []
+        for owner in range(len(texts)):
+            rows = owners == owner
+            weights = token_counts[rows][:, None]
+            embeddings.append((pooled[rows] * weights).sum(axis=0, keepdims=True) / weights.sum())
+        return embeddings
+    
+    def _split_windows(self, tokens: List[int]) -> List[List[int]]:
+        """Overlapping windows of window_size tokens, the last one ending at the final token"""
+        if len(tokens) <= self.window_size:
+            return [tokens]
+        starts = list(range(0, len(tokens) - self.window_size + 1, self.window_stride))
+        if starts[-1] + self.window_size < len(tokens):
+            starts.append(len(tokens) - self.window_size)
+        return [tokens[start:start + self.window_size] for start in starts]
+    
+    def _window_item(self, tokens: List[int]) -> Dict:
+        """Wrap a window of token IDs as a single BERT sequence: [CLS] tokens [SEP]"""
+        input_ids = [self.tokenizer.cls_token_id] + list(tokens) + [self.tokenizer.sep_token_id]
+        return {
+            'input_ids': input_ids,
+            'token_type_ids': [0] * len(input_ids),
+            'attention_mask': [1] * len(input_ids)
+        }
+    
+    def _encode_items(self, items: List[Dict], batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean-pool BERT over tokenized items, bucketing by length to minimise padding"""
+        lengths = [len(item['input_ids']) for item in items]
+        
+        # Sort by length so each bucket is only padded to its longest member
+        order = sorted(range(len(items)), key=lambda i: lengths[i])
+        pooled = np.zeros((len(items), self.model.config.hidden_size), dtype=np.float32)
+        
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            batch = self.tokenizer.pad([items[i] for i in bucket], return_tensors='pt')
+            with torch.no_grad():
+                outputs = self.model(**batch)
+            
+            # Mean over real tokens only, so padding does not change the embedding
+            mask = batch['attention_mask'].unsqueeze(-1).type_as(outputs.last_hidden_state)
+            summed = (outputs.last_hidden_state * mask).sum(dim=1)
+            pooled[bucket] = (summed / mask.sum(dim=1).clamp(min=1)).numpy()
+        
+        return pooled, np.array(lengths, dtype=np.float32)
+    
+    def _build_text_result(self, text: str, embeddings: np.ndarray) -> Dict:
+        """Combine BERT embeddings with rule-based features into a result dict"""
+        
+        # Keyword counts, shared by the keyword and linguistic analyses
+        keyword_counts = self.keyword_matcher.count(text.lower())
         
         # Keyword-based analysis
-        keyword_scores = self._analyze_keywords(text)
+        keyword_scores = self._analyze_keywords(text, keyword_counts)
         
         # Pattern matching
-        pattern_score = self._analyze_patterns(text)
+        matched_patterns = self.pattern_matcher.match(text.lower())
+        pattern_score = min(len(matched_patterns) / len(self.scam_patterns), 1.0)
         
         # Linguistic features
-        linguistic_features = self._extract_linguistic_features(text)
+        linguistic_features = self._extract_linguistic_features(text, keyword_counts)
         
-        # Combine all features
+        return self._assemble_result(embeddings, keyword_scores, pattern_score, linguistic_features,
+                                     matched_patterns)
+    
+    def _assemble_result(self, embeddings: np.ndarray, keyword_scores: Dict, pattern_score: float,
+                         linguistic_features: Dict, matched_patterns: Optional[List[str]] = None) -> Dict:
+        """Score the extracted features and package them as an analysis result"""
         fraud_score = self._calculate_fraud_score(
             embeddings, keyword_scores, pattern_score, linguistic_features
         )
@@ -66,37 +519,28 @@ class BERTTextAnalyzer:
             'bert_embeddings': embeddings.tolist(),
             'keyword_analysis': keyword_scores,
             'pattern_score': pattern_score,
+            'matched_patterns': matched_patterns or [],
             'linguistic_features': linguistic_features,
             'risk_level': self._get_risk_level(fraud_score),
             'explanations': self._generate_explanations(keyword_scores, pattern_score)
         }
     
-    def _analyze_keywords(self, text: str) -> Dict:
+    def _analyze_keywords(self, text: str, keyword_counts: Optional[Dict] = None) -> Dict:
         """Analyze fraud-related keywords in text"""
-        text_lower = text.lower()
-        scores = {}
-        
-        for category, keywords in self.fraud_keywords.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in text_lower:
-                    score += text_lower.count(keyword)
-            scores[category] = min(score / len(keywords), 1.0)
+        if keyword_counts is None:
+            keyword_counts = self.keyword_matcher.count(text.lower())
         
-        return scores
+        return {
+            category: min(keyword_counts[category] / len(keywords), 1.0)
+            for category, keywords in self.fraud_keywords.items()
+        }
     
     def _analyze_patterns(self, text: str) -> float:
-        """Analyze scam patterns using regex"""
-        pattern_score = 0
-        text_lower = text.lower()
-        
-        for pattern in self.scam_patterns:
-            if re.search(pattern, text_lower):
-                pattern_score += 1
-        
-        return min(pattern_score / len(self.scam_patterns), 1.0)
+        """Analyze scam patterns using the precompiled pattern set"""
+        matched = self.pattern_matcher.match(text.lower())
+        return min(len(matched) / len(self.scam_patterns), 1.0)
     
-    def _extract_linguistic_features(self, text: str) -> Dict:
+    def _extract_linguistic_features(self, text: str, keyword_counts: Optional[Dict] = None) -> Dict:
         """Extract linguistic features for fraud detection"""
         features = {
             'uppercase_ratio': sum(1 for c in text if c.isupper()) / len(text) if text else 0,
@@ -113,11 +557,10 @@ class BERTTextAnalyzer:
             features['avg_sentence_length'] = sum(len(s.split()) for s in sentences) / len(sentences)
         
         # Count urgency and authority words
-        text_lower = text.lower()
-        for word in self.fraud_keywords['urgency']:
-            features['urgency_words'] += text_lower.count(word)
-        for word in self.fraud_keywords['authority']:
-            features['authority_words'] += text_lower.count(word)
+        if keyword_counts is None:
+            keyword_counts = self.keyword_matcher.count(text.lower())
+        features['urgency_words'] = keyword_counts['urgency']
+        features['authority_words'] = keyword_counts['authority']
         
         return features
     
@@ -135,6 +578,7 @@ class BERTTextAnalyzer:
         pattern_weight = pattern_score * 0.3
         
         # Linguistic score
+        features = linguistic_features
         linguistic_score = (
             min(features['uppercase_ratio'] * 5, 1.0) * 0.1 +
             min(features['exclamation_count'] / 10, 1.0) * 0.1 +
@@ -190,16 +634,186 @@ class BERTTextAnalyzer:
         return explanations
 
 
+class IncrementalTextAnalyzer:
+    """Stateful per-call text analysis for a transcript that grows chunk by chunk.
+    
+    Keyword counts, scam pattern progress and linguistic counters are updated
+    from each appended chunk only, and BERT re-encodes just the trailing window,
+    so the cost of an update does not grow with the length of the call.
+    """
+    
+    # Upper bound on characters per BERT token when sizing the trailing text buffer
+    CHARS_PER_TOKEN = 8
+    
+    def __init__(self, analyzer: BERTTextAnalyzer):
+        self.analyzer = analyzer
+        
+        # Keywords: running counts plus enough trailing text to catch boundary matches
+        self.keyword_counts = {category: 0 for category in analyzer.fraud_keywords}
+        self._keyword_overlap = analyzer.keyword_matcher.max_keyword_length - 1
+        
+        # Scam patterns: those fired so far, plus the trailing words a new match could start in
+        self.matched_patterns = []
+        self._pattern_tail = ''
+        
+        # Linguistic counters
+        self.char_count = 0
+        self.uppercase_count = 0
+        self.exclamation_count = 0
+        self.question_count = 0
+        self.delimiter_runs = 0
+        self.word_count = 0
+        self.nonempty_sentences = 0
+        self._in_word = False
+        self._in_delimiter = False
+        self._sentence_has_content = False
+        
+        # Lower-cased tail for keyword matching, original-case tail for BERT
+        self._keyword_tail = ''
+        self._bert_tail = ''
+        self._bert_tail_chars = analyzer.window_size * self.CHARS_PER_TOKEN
+        self.embeddings = np.zeros((1, analyzer.model.config.hidden_size), dtype=np.float32)
+    
+    def append(self, text: str) -> Dict:
+        """Add the next transcript chunk and return the updated analysis"""
+        if text:
+            lowered = text.lower()
+            self._update_keywords(lowered)
+            self._update_patterns(lowered)
+            self._update_linguistics(text)
+            self._update_embeddings(text)
+        
+        return self.get_result()
+    
+    def get_result(self) -> Dict:
+        """Current analysis for everything appended so far"""
+        keyword_scores = {
+            category: min(self.keyword_counts[category] / len(keywords), 1.0)
+            for category, keywords in self.analyzer.fraud_keywords.items()
+        }
+        pattern_score = min(len(self.matched_patterns) / len(self.analyzer.scam_patterns), 1.0)
+        
+        sentences = self.nonempty_sentences + (1 if self._sentence_has_content else 0)
+        linguistic_features = {
+            'uppercase_ratio': self.uppercase_count / self.char_count if self.char_count else 0,
+            'exclamation_count': self.exclamation_count,
+            'question_count': self.question_count,
+            'sentence_count': self.delimiter_runs + 1,
+            'avg_sentence_length': self.word_count / sentences if sentences else 0,
+            'urgency_words': self.keyword_counts.get('urgency', 0),
+            'authority_words': self.keyword_counts.get('authority', 0)
+        }
+        
+        return self.analyzer._assemble_result(self.embeddings, keyword_scores, pattern_score, linguistic_features,
+                                              self.matched_patterns)
+    
+    def _update_keywords(self, lowered: str):
+        """Count keyword occurrences that end inside the new chunk"""
+        matcher = self.analyzer.keyword_matcher
+        combined = self._keyword_tail + lowered
+        tail_counts = matcher.count(self._keyword_tail)
+        for category, count in matcher.count(combined).items():
+            self.keyword_counts[category] += count - tail_counts[category]
+        self._keyword_tail = combined[-self._keyword_overlap:] if self._keyword_overlap else ''
+    
+    def _update_patterns(self, lowered: str):
+        """Search the new chunk plus the trailing words for patterns that have not fired yet"""
+        matcher = self.analyzer.pattern_matcher
+        combined = self._pattern_tail + lowered
+        newly_matched = matcher.match(combined, exclude=self.matched_patterns)
+        if newly_matched:
+            # Keep declaration order so results match analyze_text
+            fired = set(self.matched_patterns) | set(newly_matched)
+            self.matched_patterns = [pattern for pattern in matcher.patterns if pattern in fired]
+        self._pattern_tail = matcher.tail(combined)
+    
+    def _update_linguistics(self, text: str):
+        """Update character, punctuation, word and sentence counters from a chunk"""
+        self.char_count += len(text)
+        self.uppercase_count += sum(1 for c in text if c.isupper())
+        self.exclamation_count += text.count('!')
+        self.question_count += text.count('?')
+        
+        # Sentence delimiters: a run continuing from the previous chunk is not a new split
+        runs = re.findall(r'[.!?]+', text)
+        self.delimiter_runs += len(runs)
+        if runs and self._in_delimiter and text[0] in '.!?':
+            self.delimiter_runs -= 1
+        
+        # Words never span whitespace or delimiters; join a word split across chunks
+        words = re.findall(r'[^\s.!?]+', text)
+        self.word_count += len(words)
+        if words and self._in_word and not (text[0].isspace() or text[0] in '.!?'):
+            self.word_count -= 1
+        
+        # Non-empty sentences; the first segment may continue the previous open sentence
+        segments = re.split(r'[.!?]+', text)
+        for position, segment in enumerate(segments):
+            has_content = bool(segment.strip())
+            if position > 0:
+                if self._sentence_has_content:
+                    self.nonempty_sentences += 1
+                self._sentence_has_content = False
+            self._sentence_has_content = self._sentence_has_content or has_content
+        
+        last = text[-1]
+        self._in_delimiter = last in '.!?'
+        self._in_word = not (last.isspace() or self._in_delimiter)
+    
+    def _update_embeddings(self, text: str):
+        """Re-encode only the trailing window of the transcript with BERT"""
+        self._bert_tail = (self._bert_tail + text)[-self._bert_tail_chars:]
+        tokens = self.analyzer.tokenizer(self._bert_tail, add_special_tokens=False)['input_ids']
+        window = tokens[-self.analyzer.window_size:]
+        pooled, _ = self.analyzer._encode_items([self.analyzer._window_item(window)], 1)
+        self.embeddings = pooled
+
+
 class LSTMAudioAnalyzer:
     """LSTM-based audio analysis for fraud detection"""
     
-    def __init__(self):
+    # STFT framing used for MFCCs, also needed to cut live audio into frames
+    N_FFT = 2048
+    HOP_LENGTH = 512
+    
+    # Feature groups computed per profile. 'minimal' covers what the fraud score and
+    # explanations read, 'scoring' adds the features reported to clients, and 'full'
+    # adds research-only tempo. Spectrograms a group needs come lazily from SpectralContext.
+    FEATURE_PROFILES = {
+        'minimal': ('stress_indicator', 'pauses', 'background_noise'),
+        'scoring': ('stress_indicator', 'pauses', 'background_noise', 'speech_rate',
+                    'mfcc', 'pitch', 'energy', 'spectral_centroid', 'zcr'),
+        'full': ('stress_indicator', 'pauses', 'background_noise', 'speech_rate',
+                 'mfcc', 'pitch', 'energy', 'spectral_centroid', 'zcr', 'tempo'),
+    }
+    
+    def __init__(self, batch_size: int = 32, max_streams: int = 1000, compiled: Optional[bool] = None,
+                 profile: Optional[str] = None, pitch_estimator: Optional[Union[str, object]] = None):
         # Initialize LSTM model for audio analysis
         self.lstm_model = self._build_lstm_model()
         self.lstm_model.eval()
         
+        # Optional TorchScript path: scripted and frozen once per process
+        if compiled is None:
+            compiled = os.environ.get('AUDIO_LSTM_COMPILED', '').lower() in ('1', 'true', 'yes')
+        self.compiled = compiled
+        self.inference_model = self._compile_lstm_model() if compiled else self.lstm_model
+        
         # Audio feature extractors
         self.sample_rate = 16000
+        self.profile = self._check_profile(profile or os.environ.get('AUDIO_FEATURE_PROFILE', 'full'))
+        
+        # Pitch features from piptrack (default) or the faster YIN on voiced frames
+        # ('yin'), also settable with AUDIO_PITCH_ESTIMATOR
+        self.pitch_estimator = get_pitch_estimator(pitch_estimator)
+        
+        # Maximum sequences per LSTM forward pass when scoring in bulk
+        self.batch_size = batch_size
+        
+        # Live calls: LSTM state per call ID, least recently used first
+        self.max_streams = max_streams
+        self._streams = OrderedDict()
+        self._streams_lock = threading.Lock()
         
     def _build_lstm_model(self) -> nn.Module:
         """Build LSTM model for audio sequence analysis"""
@@ -211,40 +825,77 @@ class LSTMAudioAnalyzer:
                 self.output = nn.Linear(32, 1)
                 self.dropout = nn.Dropout(0.3)
                 
-            def forward(self, x):
-                lstm_out, _ = self.lstm(x)
-                # Take the last output
-                output = self.dropout(lstm_out[:, -1, :])
+            def forward(self, x, lengths: Optional[torch.Tensor] = None):
+                if lengths is None:
+                    _, (h_n, _) = self.lstm(x)
+                else:
+                    # Padded batches are packed so each sequence stops at its real length
+                    packed = nn.utils.rnn.pack_padded_sequence(x, lengths, batch_first=True)
+                    _, (h_n, _) = self.lstm(packed)
+                # Take the last output (final hidden state of the top layer)
+                return self.head(h_n[-1])
+            
+            @torch.jit.export
+            def stream(self, x, state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+                """Continue a sequence from a previous (h, c) state"""
+                _, state = self.lstm(x, state)
+                return self.head(state[0][-1]), state
+            
+            def head(self, hidden):
+                output = self.dropout(hidden)
                 output = torch.relu(self.fc(output))
                 output = torch.sigmoid(self.output(output))
                 return output
         
         return AudioLSTM()
     
-    def analyze_audio(self, audio_path: str) -> Dict:
-        """Analyze audio file for fraud indicators"""
+    def _compile_lstm_model(self) -> torch.jit.ScriptModule:
+        """Script and freeze the LSTM (dropping dropout) for this process's weights"""
+        return torch.jit.freeze(torch.jit.script(self.lstm_model.eval()), preserved_attrs=['stream'])
+    
+    def analyze_audio(self, audio: Union[str, AudioBuffer], profile: Optional[str] = None) -> Dict:
+        """Analyze an audio file or decoded AudioBuffer for fraud indicators"""
+        return self.analyze_audio_batch([audio], profile)[0]
+    
+    def analyze_audio_batch(self, audios: List[Union[str, AudioBuffer]], profile: Optional[str] = None) -> List[Dict]:
+        """Analyze many audio files or buffers, scoring all their LSTM sequences together"""
+        groups = self.FEATURE_PROFILES[self._check_profile(profile or self.profile)]
+        results = [None] * len(audios)
+        prepared = []
+        
+        for index, audio in enumerate(audios):
+            try:
+                # Load audio (paths are decoded here, buffers are reused as-is)
+                buffer = self._load_buffer(audio)
+                y, sr = buffer.samples, buffer.sr
+                
+                # Spectrograms shared by every feature below (and cached on the buffer)
+                context = buffer.spectral_context(self.N_FFT, self.HOP_LENGTH)
+                
+                # Extract audio features
+                features = self._extract_audio_features(y, sr, context, groups)
+                
+                # Additional acoustic analysis
+                acoustic_features = self._analyze_acoustic_patterns(y, sr, context, groups)
+                
+                prepared.append((index, self._prepare_lstm_input(context.mfcc(13)), features, acoustic_features))
+                
+            except Exception as e:
+                results[index] = self._error_result(e)
         
+        # Get LSTM predictions in one pass over all sequences
         try:
-            # Load audio
-            y, sr = librosa.load(audio_path, sr=self.sample_rate)
-            
-            # Extract audio features
-            features = self._extract_audio_features(y, sr)
-            
-            # Prepare LSTM input
-            lstm_input = self._prepare_lstm_input(features)
-            
-            # Get LSTM prediction
-            with torch.no_grad():
-                lstm_score = self.lstm_model(lstm_input).item()
-            
-            # Additional acoustic analysis
-            acoustic_features = self._analyze_acoustic_patterns(y, sr)
-            
+            lstm_scores = self.score_sequences([sequence for _, sequence, _, _ in prepared])
+        except Exception as e:
+            for index, _, _, _ in prepared:
+                results[index] = self._error_result(e)
+            return results
+        
+        for (index, _, features, acoustic_features), lstm_score in zip(prepared, lstm_scores):
             # Combine scores
             fraud_score = self._combine_audio_scores(lstm_score, acoustic_features)
             
-            return {
+            results[index] = {
                 'fraud_score': float(fraud_score),
                 'lstm_score': float(lstm_score),
                 'acoustic_features': acoustic_features,
@@ -252,114 +903,237 @@ class LSTMAudioAnalyzer:
                 'risk_level': self._get_risk_level(fraud_score),
                 'explanations': self._generate_audio_explanations(acoustic_features)
             }
+        
+        return results
+    
+    def _load_buffer(self, audio: Union[str, AudioBuffer]) -> AudioBuffer:
+        """Decode a path, or resample a buffer, to the analyzer's sample rate"""
+        if isinstance(audio, AudioBuffer):
+            return audio.resample(self.sample_rate)
+        return AudioBuffer.load(audio, sr=self.sample_rate)
+    
+    def _check_profile(self, profile: str) -> str:
+        """Validate a feature profile name"""
+        if profile not in self.FEATURE_PROFILES:
+            raise ValueError(f"Unknown feature profile '{profile}', expected one of {list(self.FEATURE_PROFILES)}")
+        return profile
+    
+    def score_sequences(self, sequences: List[np.ndarray], batch_size: Optional[int] = None) -> List[float]:
+        """Score (frames, 13) feature sequences with the LSTM, in input order.
+        
+        Sequences are sorted by length and scored in buckets of batch_size, each
+        padded to its longest member and packed so padding is never processed.
+        """
+        batch_size = batch_size or self.batch_size
+        order = sorted(range(len(sequences)), key=lambda i: len(sequences[i]), reverse=True)
+        scores = [0.0] * len(sequences)
+        
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            tensors = [torch.as_tensor(sequences[i], dtype=torch.float32) for i in bucket]
+            lengths = torch.tensor([len(t) for t in tensors])
+            padded = nn.utils.rnn.pad_sequence(tensors, batch_first=True)
+            with torch.inference_mode():
+                output = self.inference_model(padded, lengths).squeeze(-1).tolist()
+            for index, score in zip(bucket, output):
+                scores[index] = score
+        
+        return scores
+    
+    def stream_frames(self, call_id: str, frames: np.ndarray) -> Dict:
+        """Feed (frames, 13) MFCC frames for a live call and return its rolling score"""
+        frames = np.asarray(frames, dtype=np.float32).reshape(-1, 13)
+        with self._streams_lock:
+            stream = self._get_stream(call_id)
+        with stream['lock']:
+            return self._apply_frames(call_id, stream, frames)
+    
+    def stream_audio(self, call_id: str, samples: np.ndarray) -> Dict:
+        """Feed mono float samples at self.sample_rate for a live call.
+        
+        Samples that do not yet fill a whole STFT frame are kept for the next
+        chunk, so chunk boundaries do not change the frame sequence. Frames are
+        cut without padding (center=False) as the audio arrives, so the score
+        follows but does not equal analyze_audio's on the finished recording.
+        """
+        with self._streams_lock:
+            stream = self._get_stream(call_id)
+        
+        # Held until the frames are applied, so concurrent chunks of one call stay in order
+        with stream['lock']:
+            buffer = np.concatenate([stream['pending'], np.asarray(samples, dtype=np.float32)])
+            count = 1 + (len(buffer) - self.N_FFT) // self.HOP_LENGTH if len(buffer) >= self.N_FFT else 0
+            stream['pending'] = buffer[count * self.HOP_LENGTH:]
             
-        except Exception as e:
-            return {
-                'fraud_score': 0.0,
-                'error': str(e),
-                'risk_level': 'low'
-            }
+            if count == 0:
+                return self._apply_frames(call_id, stream, np.zeros((0, 13), dtype=np.float32))
+            
+            used = buffer[:(count - 1) * self.HOP_LENGTH + self.N_FFT]
+            mfccs = librosa.feature.mfcc(y=used, sr=self.sample_rate, n_mfcc=13,
+                                         n_fft=self.N_FFT, hop_length=self.HOP_LENGTH, center=False)
+            return self._apply_frames(call_id, stream, self._prepare_lstm_input(mfccs))
+    
+    def _apply_frames(self, call_id: str, stream: Dict, frames: np.ndarray) -> Dict:
+        """Advance a stream's LSTM state over frames (caller holds the stream's lock)"""
+        if len(frames):
+            x = torch.from_numpy(np.ascontiguousarray(frames)).unsqueeze(0)
+            with torch.inference_mode():
+                output, stream['state'] = self.inference_model.stream(x, stream['state'])
+            stream['score'] = output.item()
+            stream['frames'] += len(frames)
+        return self._stream_result(call_id, stream)
+    
+    def reset_stream(self, call_id: str):
+        """Start a call's stream over from an empty state"""
+        with self._streams_lock:
+            if call_id in self._streams:
+                self._streams[call_id] = self._new_stream()
+    
+    def evict_stream(self, call_id: str) -> bool:
+        """Drop a call's stream state; returns whether it existed"""
+        with self._streams_lock:
+            return self._streams.pop(call_id, None) is not None
+    
+    def _get_stream(self, call_id: str) -> Dict:
+        """Fetch (or create) a call's stream, evicting the least recently used past max_streams"""
+        stream = self._streams.get(call_id)
+        if stream is None:
+            stream = self._streams[call_id] = self._new_stream()
+            while len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        self._streams.move_to_end(call_id)
+        return stream
+    
+    def _new_stream(self) -> Dict:
+        # Each stream has its own lock, so calls run the LSTM concurrently while one call's chunks stay ordered
+        return {'state': None, 'frames': 0, 'score': 0.0, 'pending': np.zeros(0, dtype=np.float32),
+                'lock': threading.Lock()}
+    
+    def _stream_result(self, call_id: str, stream: Dict) -> Dict:
+        return {
+            'call_id': call_id,
+            'lstm_score': float(stream['score']),
+            'frames_processed': stream['frames'],
+            'risk_level': self._get_risk_level(stream['score'])
+        }
+    
+    def _error_result(self, error: Exception) -> Dict:
+        """Result returned when a file cannot be analyzed"""
+        return {
+            'fraud_score': 0.0,
+            'error': str(error),
+            'risk_level': 'low'
+        }
     
-    def _extract_audio_features(self, y: np.ndarray, sr: int) -> Dict:
-        """Extract comprehensive audio features"""
+    def _extract_audio_features(self, y: np.ndarray, sr: int, context: Optional[SpectralContext] = None,
+                                groups: Optional[Tuple[str, ...]] = None) -> Dict:
+        """Extract comprehensive audio features (only the given feature groups, default all)"""
         features = {}
+        if context is None:
+            context = SpectralContext(y, sr)
+        if groups is None:
+            groups = self.FEATURE_PROFILES['full']
         
         # MFCC features
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        features['mfcc_mean'] = np.mean(mfccs, axis=1).tolist()
-        features['mfcc_std'] = np.std(mfccs, axis=1).tolist()
+        if 'mfcc' in groups:
+            mfccs = context.mfcc(13)
+            features['mfcc_mean'] = np.mean(mfccs, axis=1).tolist()
+            features['mfcc_std'] = np.std(mfccs, axis=1).tolist()
         
         # Pitch features
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:
-                pitch_values.append(pitch)
-        
-        if pitch_values:
-            features['pitch_mean'] = np.mean(pitch_values)
-            features['pitch_std'] = np.std(pitch_values)
-            features['pitch_range'] = np.max(pitch_values) - np.min(pitch_values)
-        else:
-            features['pitch_mean'] = 0
-            features['pitch_std'] = 0
-            features['pitch_range'] = 0
+        if 'pitch' in groups:
+            pitch_values = self.pitch_estimator.contour(context)
+            
+            if len(pitch_values):
+                features['pitch_mean'] = np.mean(pitch_values)
+                features['pitch_std'] = np.std(pitch_values)
+                features['pitch_range'] = np.max(pitch_values) - np.min(pitch_values)
+            else:
+                features['pitch_mean'] = 0
+                features['pitch_std'] = 0
+                features['pitch_range'] = 0
         
         # Energy features
-        features['energy'] = np.sum(y ** 2)
-        features['energy_std'] = np.std(librosa.feature.rms(y=y)[0])
+        if 'energy' in groups:
+            features['energy'] = np.sum(y ** 2)
+            features['energy_std'] = np.std(context.rms())
         
         # Spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-        features['spectral_centroid_mean'] = np.mean(spectral_centroids)
-        features['spectral_centroid_std'] = np.std(spectral_centroids)
+        if 'spectral_centroid' in groups:
+            spectral_centroids = context.spectral_centroid()
+            features['spectral_centroid_mean'] = np.mean(spectral_centroids)
+            features['spectral_centroid_std'] = np.std(spectral_centroids)
         
         # Zero crossing rate
-        zcr = librosa.feature.zero_crossing_rate(y)[0]
-        features['zcr_mean'] = np.mean(zcr)
-        features['zcr_std'] = np.std(zcr)
+        if 'zcr' in groups:
+            zcr = librosa.feature.zero_crossing_rate(y)[0]
+            features['zcr_mean'] = np.mean(zcr)
+            features['zcr_std'] = np.std(zcr)
         
         # Tempo
-        tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-        features['tempo'] = float(tempo)
+        if 'tempo' in groups:
+            tempo, beats = librosa.beat.beat_track(onset_envelope=context.onset_envelope(), sr=sr)
+            features['tempo'] = float(np.atleast_1d(tempo)[0])
         
         return features
     
-    def _prepare_lstm_input(self, features: Dict) -> torch.Tensor:
+    def _prepare_lstm_input(self, mfccs: np.ndarray) -> np.ndarray:
         """Prepare features for LSTM input"""
-        # Combine MFCC features as sequence
-        mfcc_sequence = np.array(features['mfcc_mean']).reshape(1, -1, 1)
-        return torch.FloatTensor(mfcc_sequence)
+        # MFCC frames as a (frames, 13) sequence, matching the LSTM's input_size
+        return np.ascontiguousarray(mfccs.T, dtype=np.float32)
     
-    def _analyze_acoustic_patterns(self, y: np.ndarray, sr: int) -> Dict:
-        """Analyze acoustic patterns indicative of fraud"""
+    def _analyze_acoustic_patterns(self, y: np.ndarray, sr: int, context: Optional[SpectralContext] = None,
+                                   groups: Optional[Tuple[str, ...]] = None) -> Dict:
+        """Analyze acoustic patterns indicative of fraud (only the given feature groups, default all)"""
         patterns = {}
+        if context is None:
+            context = SpectralContext(y, sr)
+        if groups is None:
+            groups = self.FEATURE_PROFILES['full']
         
         # Speech rate analysis
-        frames = librosa.util.frame(y, frame_length=2048, hop_length=512)
-        energy = np.sum(frames ** 2, axis=0)
-        speech_frames = energy > np.mean(energy) * 0.1
-        patterns['speech_rate'] = np.sum(speech_frames) / len(speech_frames)
+        if 'speech_rate' in groups:
+            frames = librosa.util.frame(y, frame_length=2048, hop_length=512)
+            energy = np.sum(frames ** 2, axis=0)
+            speech_frames = energy > np.mean(energy) * 0.1
+            patterns['speech_rate'] = np.sum(speech_frames) / len(speech_frames)
         
         # Pause analysis
-        pauses = self._detect_pauses(y, sr)
-        patterns['pause_frequency'] = len(pauses) / (len(y) / sr)
-        patterns['avg_pause_duration'] = np.mean(pauses) if pauses else 0
+        if 'pauses' in groups:
+            pauses = self._detect_pauses(y, sr)
+            patterns['pause_frequency'] = len(pauses) / (len(y) / sr)
+            patterns['avg_pause_duration'] = np.mean(pauses) if pauses else 0
         
         # Stress indicators (pitch variability)
-        pitches, _ = librosa.piptrack(y=y, sr=sr)
-        pitch_variability = np.std(pitches[pitches > 0]) if np.any(pitches > 0) else 0
-        patterns['stress_indicator'] = min(pitch_variability / 100, 1.0)
+        if 'stress_indicator' in groups:
+            voiced = self.pitch_estimator.candidates(context)
+            pitch_variability = np.std(voiced) if len(voiced) else 0
+            patterns['stress_indicator'] = min(pitch_variability / 100, 1.0)
         
         # Background noise analysis
-        noise_level = np.percentile(np.abs(y), 10)
-        patterns['background_noise'] = min(noise_level / 0.1, 1.0)
+        if 'background_noise' in groups:
+            noise_level = np.percentile(np.abs(y), 10)
+            patterns['background_noise'] = min(noise_level / 0.1, 1.0)
         
         return patterns
     
     def _detect_pauses(self, y: np.ndarray, sr: int) -> List[float]:
         """Detect pauses in speech"""
-        # Simple energy-based pause detection
+        # Simple energy-based pause detection over whole 100ms frames
         frame_length = int(0.1 * sr)  # 100ms frames
-        energy = []
-        for i in range(0, len(y) - frame_length, frame_length):
-            frame_energy = np.sum(y[i:i+frame_length] ** 2)
-            energy.append(frame_energy)
+        n_frames = max(0, -(-(len(y) - frame_length) // frame_length))
+        if n_frames == 0:
+            return []
+        frames = y[:n_frames * frame_length].reshape(n_frames, frame_length)
+        energy = np.sum(frames ** 2, axis=1)
         
-        # Find pauses (low energy frames)
+        # Find pauses (runs of low energy frames closed by a louder frame)
         threshold = np.mean(energy) * 0.1
-        pause_durations = []
-        current_pause = 0
-        
-        for e in energy:
-            if e < threshold:
-                current_pause += 1
-            else:
-                if current_pause > 0:
-                    pause_durations.append(current_pause * 0.1)  # Convert to seconds
-                    current_pause = 0
+        edges = np.diff(np.concatenate(([0], (energy < threshold).astype(np.int8))))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        run_lengths = ends - starts[:len(ends)]
+        pause_durations = (run_lengths * 0.1).tolist()  # Convert to seconds
         
         return pause_durations
     
@@ -405,58 +1179,899 @@ class LSTMAudioAnalyzer:
         return explanations
 
 
+class IVFIndex:
+    """Inverted-file ANN index: k-means cells over unit vectors, searched by probing the closest cells.
+    
+    The index only holds cell assignments (row numbers); vectors stay in the
+    caller's matrix. n_probe trades recall for latency: each query scores the
+    rows of its n_probe most similar cells instead of every row.
+    """
+    
+    def __init__(self, n_lists: int, n_probe: int = 8, iterations: int = 10, sample_per_list: int = 32,
+                 seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.iterations = iterations
+        self.sample_per_list = sample_per_list
+        self.rng = np.random.default_rng(seed)
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._row_lists = np.zeros(0, dtype=np.int32)  # cell of each row, -1 if unassigned
+        self._row_slots = np.zeros(0, dtype=np.int64)  # position of each row in its cell's array
+        # Per cell: row array (grown by doubling), entries in use, and a mask of entries
+        # left behind by rows that moved to another cell
+        self._lists: List[np.ndarray] = []
+        self._sizes = np.zeros(0, dtype=np.int64)
+        self._dead: List[np.ndarray] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+    
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+    
+    def train(self, vectors: np.ndarray):
+        """Fit spherical k-means on a sample of vectors, then assign every row"""
+        n_lists = min(self.n_lists, len(vectors))
+        sample_size = min(len(vectors), n_lists * self.sample_per_list)
+        sample = vectors[self.rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[self.rng.choice(sample_size, n_lists, replace=False)].copy()
+        
+        for _ in range(self.iterations):
+            labels = self._assign(sample, centroids)
+            sums = np.stack([np.bincount(labels, weights=sample[:, j], minlength=n_lists)
+                             for j in range(sample.shape[1])], axis=1)
+            counts = np.bincount(labels, minlength=n_lists)
+            # Empty cells are reseeded from random sample points
+            empty = counts == 0
+            sums[empty] = sample[self.rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+        
+        self.centroids = centroids
+        self.trained_size = len(vectors)
+        self.rebuild(vectors)
+    
+    def rebuild(self, vectors: np.ndarray):
+        """Reassign every row to the existing cells (after rows were renumbered)"""
+        labels = self._assign(vectors, self.centroids)
+        n_lists = len(self.centroids)
+        
+        # Group rows by cell with one stable sort; each cell's rows stay in row order
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=n_lists)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self._lists = np.split(order, np.cumsum(counts)[:-1])
+        self._sizes = counts.astype(np.int64)
+        self._dead = [np.zeros(count, dtype=bool) for count in counts]
+        self._list_arrays = [None] * n_lists
+        
+        self._row_lists = labels.astype(np.int32)
+        self._row_slots = np.empty(len(labels), dtype=np.int64)
+        self._row_slots[order] = np.arange(len(labels)) - starts[labels[order]]
+    
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Assign rows (new, or re-enrolled with new vectors) to their nearest cells"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(self._row_lists) <= rows.max(initial=-1):
+            size = max(rows.max() + 1, 2 * len(self._row_lists))
+            self._row_lists = self._grow(self._row_lists, size, -1)
+            self._row_slots = self._grow(self._row_slots, size, 0)
+        
+        labels = self._assign(vectors, self.centroids)
+        previous = self._row_lists[rows]
+        moved = previous != labels
+        rows, labels, previous = rows[moved], labels[moved], previous[moved]
+        
+        # Mark the entries of rows leaving a cell dead instead of removing them
+        for cell in np.unique(previous[previous >= 0]).tolist():
+            leaving = rows[previous == cell]
+            self._dead[cell][self._row_slots[leaving]] = True
+            self._list_arrays[cell] = None
+            if self._dead[cell][:self._sizes[cell]].sum() * 2 > self._sizes[cell]:
+                self._compact_list(cell)
+        
+        # Append the arriving rows to each cell in one block
+        order = np.argsort(labels, kind='stable')
+        cells, starts = np.unique(labels[order], return_index=True)
+        for cell, block in zip(cells.tolist(), np.split(rows[order], starts[1:])):
+            size = self._sizes[cell]
+            if size + len(block) > len(self._lists[cell]):
+                capacity = max(size + len(block), 2 * len(self._lists[cell]))
+                self._lists[cell] = self._grow(self._lists[cell], capacity, 0)
+                self._dead[cell] = self._grow(self._dead[cell], capacity, False)
+            self._lists[cell][size:size + len(block)] = block
+            self._dead[cell][size:size + len(block)] = False
+            self._row_slots[block] = np.arange(size, size + len(block))
+            self._sizes[cell] = size + len(block)
+            self._list_arrays[cell] = None
+        self._row_lists[rows] = labels
+    
+    def _compact_list(self, cell: int):
+        """Drop a cell's dead entries and renumber the slots of the rows left"""
+        size = self._sizes[cell]
+        live = self._lists[cell][:size][~self._dead[cell][:size]]
+        self._lists[cell] = live.copy()
+        self._dead[cell] = np.zeros(len(live), dtype=bool)
+        self._sizes[cell] = len(live)
+        self._row_slots[live] = np.arange(len(live))
+    
+    @staticmethod
+    def _grow(array: np.ndarray, size: int, fill) -> np.ndarray:
+        """Copy of a 1-D array extended to size, new entries set to fill"""
+        grown = np.full(size, fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+    
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Rows in the n_probe cells most similar to the query"""
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        scores = self.centroids @ query
+        probed = np.argpartition(scores, len(scores) - n_probe)[len(scores) - n_probe:]
+        
+        arrays = []
+        for cell in probed:
+            if self._list_arrays[cell] is None:
+                size = self._sizes[cell]
+                self._list_arrays[cell] = self._lists[cell][:size][~self._dead[cell][:size]]
+            arrays.append(self._list_arrays[cell])
+        return np.concatenate(arrays)
+    
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Index of the most similar centroid for each vector, in bounded-memory chunks"""
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            labels[start:start + chunk_size] = np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+        return labels
+
+
+class VoiceprintStore:
+    """Append-only voiceprint storage: a row matrix, a row log and a tombstone log.
+    
+    Rows are never rewritten. Re-enrolling a voice appends a new row and
+    tombstones the old one, so the live rows are all rows minus the tombstoned
+    ones. Without a path everything stays in memory. With a path the matrix
+    and logs are append-only files under a generation directory named by
+    CURRENT; they are memory-mapped read-only, so cold start maps them instead
+    of loading them and every process shares the same pages. Writers (in any
+    number of processes) append under an exclusive flock on LOCK, taken by
+    writing(); inside it they refresh() first, so rows are numbered after
+    every other writer's, and bytes a crashed writer left past the last
+    complete row are truncated before anything is appended. Read-only
+    processes pick up appends on refresh(). compact() writes the live rows to
+    a new generation and switches CURRENT atomically.
+    
+    Rows can be scalar-quantized: float16, or int8 codes with a per-row
+    float32 scale. Similarities are computed on the codes in chunks and scaled
+    afterwards, so the full matrix is never decompressed.
+    """
+    
+    ID_SIZE = 64
+    # Row encoding -> (code dtype, matrix file); int8 rows also get a scale in SCALES_FILE
+    ENCODINGS = {
+        'float32': (np.float32, 'vectors.f32'),
+        'float16': (np.float16, 'vectors.f16'),
+        'int8': (np.int8, 'vectors.i8'),
+    }
+    SCALES_FILE = 'scales.f32'
+    CHUNK_ROWS = 65536
+    ROWS_FILE = 'rows.log'
+    TOMBSTONES_FILE = 'tombstones.log'
+    METADATA_FILE = 'metadata.jsonl'
+    LOCK_FILE = 'LOCK'
+    
+    def __init__(self, dim: int, path: Optional[str] = None, read_only: bool = False,
+                 initial_capacity: int = 1024, encoding: str = 'float32'):
+        if encoding not in self.ENCODINGS:
+            raise ValueError(f"Unknown voiceprint encoding '{encoding}', expected one of {list(self.ENCODINGS)}")
+        self.dim = dim
+        self.path = path
+        self.read_only = read_only
+        self.encoding = encoding
+        self.code_dtype, self.matrix_file = self.ENCODINGS[encoding]
+        # One record per row; metadata lives in the JSON-lines file at [offset, offset + length)
+        self.record_dtype = np.dtype([
+            ('voice_id', 'S%d' % self.ID_SIZE), ('created_at', '<i8'),
+            ('metadata_offset', '<i8'), ('metadata_length', '<i8')
+        ])
+        self.generation = None
+        self._write_depth = 0  # nesting of writing() in this instance
+        self._rows = None  # voice ID -> live row, built on first lookup
+        self._metadata: List[Dict] = []  # in-memory mode only
+        
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._open_generation()
+        else:
+            self._vectors = np.zeros((initial_capacity, dim), dtype=self.code_dtype)
+            self._scales = np.zeros(initial_capacity if encoding == 'int8' else 0, dtype=np.float32)
+            self._records = np.zeros(initial_capacity, dtype=self.record_dtype)
+            self._live = np.zeros(initial_capacity, dtype=bool)
+            self.count = 0
+            self._tombstone_count = 0
+    
+    @property
+    def matrix(self) -> np.ndarray:
+        """All rows, live and dead, decoded to a (count, dim) float32 array (zero-copy for float32)"""
+        return self.vectors()
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the row codes and scales"""
+        scales = self.count * 4 if self.encoding == 'int8' else 0
+        return self.count * self.dim * np.dtype(self.code_dtype).itemsize + scales
+    
+    def vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Decode rows (default all) to float32"""
+        codes = self._vectors[:self.count] if rows is None else self._vectors[:self.count][rows]
+        if self.encoding == 'float32':
+            return codes
+        vectors = codes.astype(np.float32)
+        if self.encoding == 'int8':
+            scales = self._scales[:self.count] if rows is None else self._scales[:self.count][rows]
+            vectors *= scales[:, None]
+        return vectors
+    
+    def similarities(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dot products of a float32 query (dim,) or queries (dim, q) with rows (default all, or an
+        index array or slice), computed on the stored codes"""
+        codes = self._vectors[:self.count] if rows is None else self._vectors[:self.count][rows]
+        if self.encoding == 'float32':
+            return codes @ query
+        
+        # Upcast a bounded chunk of codes at a time; int8 dot products are scaled afterwards
+        similarities = np.empty((len(codes),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(codes), self.CHUNK_ROWS):
+            similarities[start:start + self.CHUNK_ROWS] = codes[start:start + self.CHUNK_ROWS].astype(np.float32) @ query
+        if self.encoding == 'int8':
+            scales = self._scales[:self.count] if rows is None else self._scales[:self.count][rows]
+            similarities *= scales.reshape((-1,) + (1,) * (query.ndim - 1))
+        return similarities
+    
+    @property
+    def live(self) -> np.ndarray:
+        """Boolean mask of live rows"""
+        return self._live[:self.count]
+    
+    @property
+    def live_count(self) -> int:
+        return self.count - self._tombstone_count
+    
+    @property
+    def dead_count(self) -> int:
+        return self._tombstone_count
+    
+    def voice_id(self, row: int) -> str:
+        return self._records[row]['voice_id'].decode('utf-8')
+    
+    def snapshot(self) -> 'VoiceprintStore':
+        """Read-only view of the rows stored so far, for scanning without holding a lock.
+        
+        Appends only write past count and compaction or growth swap in new arrays, so
+        the view's arrays stay valid; the live mask is copied since deletes flip it.
+        """
+        view = copy.copy(self)
+        view._live = self.live.copy()
+        view.read_only = True
+        return view
+    
+    def voice_ids(self) -> List[str]:
+        """IDs of the live rows, in row order"""
+        return [voice_id.decode('utf-8') for voice_id in self._records['voice_id'][:self.count][self.live]]
+    
+    def row_of(self, voice_id: str) -> Optional[int]:
+        """Live row of a voice ID, or None"""
+        return self._row_index().get(voice_id)
+    
+    def created_at(self, row: int) -> str:
+        return str(np.datetime64(int(self._records[row]['created_at']), 's'))
+    
+    def metadata(self, row: int) -> Dict:
+        if not self.path:
+            return self._metadata[row]
+        # Read through the map taken with the rows, so it works after compaction removed the file
+        record = self._records[row]
+        start = int(record['metadata_offset'])
+        return json.loads(bytes(self._metadata_map[start:start + int(record['metadata_length'])]))
+    
+    def append(self, voice_ids: List[str], vectors: np.ndarray, metadata: List[Optional[Dict]]) -> np.ndarray:
+        """Append rows, tombstoning earlier rows with the same IDs; returns the new row numbers"""
+        with self.writing():
+            self._prepare_append()
+            return self._append(voice_ids, vectors, metadata)
+    
+    def _append(self, voice_ids: List[str], vectors: np.ndarray, metadata: List[Optional[Dict]]) -> np.ndarray:
+        """append() once the write lock is held and the files end at the last complete row"""
+        # Validate and encode the whole batch before any state changes, so a rejected batch leaves none behind
+        encoded_ids = [voice_id.encode('utf-8') for voice_id in voice_ids]
+        for voice_id, encoded in zip(voice_ids, encoded_ids):
+            if len(encoded) > self.ID_SIZE:
+                raise ValueError(f"Voice ID longer than {self.ID_SIZE} bytes: {voice_id!r}")
+        metadata = [meta or {} for meta in metadata]
+        blobs = [json.dumps(meta).encode('utf-8') + b'\n' for meta in metadata] if self.path else []
+        codes, scales = self._encode(vectors)
+        if len(codes) != len(voice_ids) or len(metadata) != len(voice_ids):
+            raise ValueError(f"Got {len(codes)} vectors and {len(metadata)} metadata entries for {len(voice_ids)} voice IDs")
+        
+        index = self._row_index()
+        first_row = self.count
+        rows = np.arange(first_row, first_row + len(voice_ids))
+        
+        records = np.zeros(len(voice_ids), dtype=self.record_dtype)
+        records['created_at'] = np.datetime64('now', 's').astype(np.int64)
+        records['voice_id'] = encoded_ids
+        if self.path:
+            lengths = np.array([len(blob) for blob in blobs], dtype=np.int64)
+            offset = os.path.getsize(self._file(self.METADATA_FILE))
+            records['metadata_offset'] = offset + np.cumsum(lengths) - lengths
+            records['metadata_length'] = lengths
+        
+        # Rows this batch gives each ID; an ID repeated in the batch keeps its last row
+        assigned = {}
+        tombstones = []
+        for voice_id, row in zip(voice_ids, rows.tolist()):
+            previous = assigned.get(voice_id, index.get(voice_id))
+            if previous is not None:
+                tombstones.append(previous)
+            assigned[voice_id] = row
+        
+        if self.path:
+            # Matrix and metadata first, then the row log: a row exists once its record does
+            self._append_file(self.matrix_file, codes.tobytes())
+            if self.encoding == 'int8':
+                self._append_file(self.SCALES_FILE, scales.tobytes())
+            self._append_file(self.METADATA_FILE, b''.join(blobs))
+            self._append_file(self.ROWS_FILE, records.tobytes())
+            self._append_file(self.TOMBSTONES_FILE, np.asarray(tombstones, dtype='<i8').tobytes())
+            self._remap()
+        else:
+            needed = first_row + len(rows)
+            self._vectors = self._grow(self._vectors, needed)
+            self._records = self._grow(self._records, needed)
+            self._live = self._grow(self._live, needed)
+            self._vectors[rows] = codes
+            if self.encoding == 'int8':
+                self._scales = self._grow(self._scales, needed)
+                self._scales[rows] = scales
+            self._records[rows] = records
+            self._metadata.extend(metadata)
+            self.count = needed
+        
+        # The rows are written; only now do their IDs point at them
+        index.update(assigned)
+        self._live[rows] = True
+        self._kill(tombstones)
+        return rows
+    
+    def delete(self, voice_id: str) -> bool:
+        """Tombstone a voice ID's live row; returns False if it is not enrolled"""
+        with self.writing():
+            self._prepare_append()
+            row = self._row_index().pop(voice_id, None)
+            if row is None:
+                return False
+            if self.path:
+                self._append_file(self.TOMBSTONES_FILE, np.asarray([row], dtype='<i8').tobytes())
+            self._kill([row])
+            return True
+    
+    @contextlib.contextmanager
+    def writing(self):
+        """Hold the store's cross-process write lock (reentrant; callers serialize their threads)"""
+        if self.read_only:
+            raise PermissionError("Voiceprint store is open read-only")
+        if not self.path or self._write_depth:
+            self._write_depth += 1
+            try:
+                yield
+            finally:
+                self._write_depth -= 1
+            return
+        with open(os.path.join(self.path, self.LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._write_depth += 1
+            try:
+                yield
+            finally:
+                self._write_depth -= 1
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def refresh(self) -> Tuple[bool, np.ndarray]:
+        """Pick up another process's appends or compaction; returns (reopened, new rows)"""
+        if not self.path:
+            return False, np.zeros(0, dtype=np.int64)
+        if self._read_current() != self.generation:
+            self._open_generation()
+            return True, np.zeros(0, dtype=np.int64)
+        previous = self.count
+        tombstones = self._remap()
+        self._live[previous:self.count] = True
+        self._kill(tombstones)
+        if self.count > previous or len(tombstones):
+            self._rows = None
+        return False, np.arange(previous, self.count)
+    
+    def compact(self):
+        """Rewrite only the live rows into a new generation (renumbering rows)"""
+        with self.writing():
+            self._prepare_append()
+            self._compact()
+    
+    def _compact(self):
+        """compact() once the write lock is held"""
+        live_rows = np.flatnonzero(self.live)
+        codes = np.ascontiguousarray(self._vectors[:self.count][live_rows])
+        scales = np.ascontiguousarray(self._scales[:self.count][live_rows]) if self.encoding == 'int8' else None
+        records = np.array(self._records[:self.count][live_rows])
+        
+        if not self.path:
+            metadata = [self._metadata[row] for row in live_rows]
+            self._vectors = self._grow(codes, len(codes))
+            if self.encoding == 'int8':
+                self._scales = self._grow(scales, len(scales))
+            self._records = self._grow(records, len(records))
+            self._live = self._grow(np.ones(len(codes), dtype=bool), len(codes))
+            self._metadata = metadata
+            self.count = len(codes)
+            self._tombstone_count = 0
+            self._rows = None
+            return
+        
+        generation = (self.generation or 0) + 1
+        directory = self._generation_dir(generation)
+        os.makedirs(directory, exist_ok=True)
+        blobs = [bytes(self._metadata_map[start:start + length])
+                 for start, length in zip(records['metadata_offset'].tolist(), records['metadata_length'].tolist())]
+        lengths = records['metadata_length'].copy()
+        records['metadata_offset'] = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+        files = [(self.matrix_file, codes.tobytes()), (self.METADATA_FILE, b''.join(blobs)),
+                 (self.ROWS_FILE, records.tobytes()), (self.TOMBSTONES_FILE, b'')]
+        if self.encoding == 'int8':
+            files.append((self.SCALES_FILE, scales.tobytes()))
+        for name, data in files:
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # Switch generations atomically; readers still mapping the old one keep working
+        previous = self.generation or 0
+        temp_current = os.path.join(self.path, 'CURRENT.tmp')
+        with open(temp_current, 'w') as f:
+            f.write(str(generation))
+        os.replace(temp_current, os.path.join(self.path, 'CURRENT'))
+        self._open_generation()
+        
+        # Keep the generation just replaced until the next compaction, so readers that
+        # read CURRENT before the switch can still open it; drop the ones before it
+        for name in os.listdir(self.path):
+            if name.startswith('generation-') and int(name[len('generation-'):]) < previous:
+                old_directory = os.path.join(self.path, name)
+                for file_name in os.listdir(old_directory):
+                    os.remove(os.path.join(old_directory, file_name))
+                os.rmdir(old_directory)
+    
+    def _prepare_append(self):
+        """Catch up with other writers and cut bytes a crashed writer left past the last
+        complete row, so appends land at self.count; call under writing()"""
+        if not self.path:
+            return
+        self.refresh()
+        
+        # A row exists once its record is in the row log; vectors, scales and metadata
+        # are appended first, so anything of theirs past count is orphaned
+        metadata_end = 0
+        if self.count:
+            last = self._records[self.count - 1]
+            metadata_end = int(last['metadata_offset']) + int(last['metadata_length'])
+        ends = {
+            self.matrix_file: self.count * self.dim * np.dtype(self.code_dtype).itemsize,
+            self.ROWS_FILE: self.count * self.record_dtype.itemsize,
+            self.METADATA_FILE: metadata_end,
+        }
+        if self.encoding == 'int8':
+            ends[self.SCALES_FILE] = self.count * 4
+        tombstones = self._file(self.TOMBSTONES_FILE)
+        ends[self.TOMBSTONES_FILE] = os.path.getsize(tombstones) // 8 * 8 if os.path.exists(tombstones) else 0
+        for name, end in ends.items():
+            path = self._file(name)
+            if os.path.exists(path) and os.path.getsize(path) > end:
+                os.truncate(path, end)
+    
+    def _row_index(self) -> Dict[str, int]:
+        """Voice ID -> live row, built from the row log on first use"""
+        if self._rows is None:
+            live_rows = np.flatnonzero(self.live)
+            ids = self._records['voice_id'][:self.count][live_rows]
+            self._rows = {voice_id.decode('utf-8'): int(row) for voice_id, row in zip(ids, live_rows)}
+        return self._rows
+    
+    def _kill(self, rows):
+        """Mark rows dead, counting each row once"""
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[(rows >= 0) & (rows < self.count)]
+        rows = np.unique(rows[self._live[rows]])
+        self._live[rows] = False
+        self._tombstone_count += len(rows)
+    
+    def _read_current(self) -> Optional[int]:
+        current = os.path.join(self.path, 'CURRENT')
+        if not os.path.exists(current):
+            return None
+        with open(current) as f:
+            return int(f.read().strip())
+    
+    def _generation_dir(self, generation: Optional[int]) -> str:
+        return os.path.join(self.path, 'generation-%06d' % (generation or 0))
+    
+    def _file(self, name: str) -> str:
+        return os.path.join(self._generation_dir(self.generation), name)
+    
+    def _append_file(self, name: str, data: bytes):
+        if data:
+            with open(self._file(name), 'ab') as f:
+                f.write(data)
+    
+    def _open_generation(self):
+        """Map the current generation from scratch"""
+        self.generation = self._read_current()
+        os.makedirs(self._generation_dir(self.generation), exist_ok=True)
+        for encoding, (_, name) in self.ENCODINGS.items():
+            if encoding != self.encoding and os.path.exists(self._file(name)):
+                raise ValueError(f"Voiceprint store at {self.path} uses {encoding} rows, not {self.encoding}")
+        names = [self.matrix_file, self.ROWS_FILE, self.TOMBSTONES_FILE, self.METADATA_FILE]
+        if self.encoding == 'int8':
+            names.append(self.SCALES_FILE)
+        for name in names:
+            if not os.path.exists(self._file(name)) and not self.read_only:
+                open(self._file(name), 'ab').close()
+        self.count = 0
+        self._tombstone_count = 0
+        self._tombstones_mapped = 0
+        self._live = np.zeros(0, dtype=bool)
+        self._rows = None
+        tombstones = self._remap()
+        self._live[:self.count] = True
+        self._kill(tombstones)
+    
+    def _remap(self) -> np.ndarray:
+        """(Re)open the read-only maps past any torn trailing write; returns unseen tombstones"""
+        def mapped(name, dtype, shape_tail=()):
+            path = self._file(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            count = size // (np.dtype(dtype).itemsize * int(np.prod(shape_tail, dtype=np.int64)))
+            if count == 0:
+                return np.zeros((0,) + shape_tail, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode='r', shape=(count,) + shape_tail)
+        
+        self._records = mapped(self.ROWS_FILE, self.record_dtype)
+        # Mapped after the rows: metadata is appended before the records that point into it
+        self._metadata_map = mapped(self.METADATA_FILE, np.uint8)
+        self._vectors = mapped(self.matrix_file, self.code_dtype, (self.dim,))
+        self.count = min(len(self._records), len(self._vectors))
+        if self.encoding == 'int8':
+            self._scales = mapped(self.SCALES_FILE, np.float32)
+            self.count = min(self.count, len(self._scales))
+        else:
+            self._scales = np.zeros(0, dtype=np.float32)
+        self._live = self._grow(self._live, self.count)
+        
+        tombstones = mapped(self.TOMBSTONES_FILE, '<i8')
+        unseen = np.array(tombstones[self._tombstones_mapped:])
+        self._tombstones_mapped = len(tombstones)
+        return unseen
+    
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode float rows as (codes, per-row scales); scales are 1 unless int8"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        scales = np.ones(len(vectors), dtype=np.float32)
+        if self.encoding == 'int8':
+            # Symmetric per-row quantization: the largest component maps to +/-127
+            peaks = np.abs(vectors).max(axis=1, initial=0.0)
+            scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+            codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        else:
+            codes = vectors.astype(self.code_dtype)
+        return codes, scales
+    
+    def _grow(self, array: np.ndarray, needed: int) -> np.ndarray:
+        """Return array with room for needed rows, doubling so appends stay amortized O(1)"""
+        if needed <= len(array):
+            return array
+        grown = np.zeros((max(needed, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+
 class VoiceFingerprinting:
     """Advanced voice fingerprinting for identifying repeat scammers"""
     
-    def __init__(self):
-        self.voice_database = {}  # In production, use a proper database
+    DIM = 20  # MFCC coefficients per voiceprint
+    INDEXES = ('exact', 'ivf')
+    
+    def __init__(self, initial_capacity: int = 1024, index: Optional[str] = None, ann_min_size: int = 100000,
+                 n_lists: Optional[int] = None, n_probe: int = 16, store_path: Optional[str] = None,
+                 read_only: Optional[bool] = None, compact_ratio: float = 0.25, refresh_interval: float = 1.0,
+                 encoding: Optional[str] = None):
+        # Enrolled voiceprints: unit-norm float32 rows in an append-only store, in memory
+        # or (with store_path) memory-mapped from disk and shared between processes
+        # Rows are float32, or float16 / int8 codes to cut memory (VOICE_ENCODING)
+        # Processes that only match (e.g. extra server workers) open it read-only (VOICE_STORE_READ_ONLY)
+        if read_only is None:
+            read_only = os.environ.get('VOICE_STORE_READ_ONLY', '').lower() in ('1', 'true', 'yes')
+        self.store = VoiceprintStore(self.DIM, store_path or os.environ.get('VOICE_STORE_PATH'),
+                                     read_only=read_only, initial_capacity=initial_capacity,
+                                     encoding=encoding or os.environ.get('VOICE_ENCODING', 'float32'))
+        self.compact_ratio = compact_ratio  # compact once this fraction of rows is dead
+        self.refresh_interval = refresh_interval  # seconds between refreshes from other processes' writes
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
         self.similarity_threshold = 0.85
         
-    def create_voiceprint(self, audio_path: str) -> np.ndarray:
-        """Create voice fingerprint from audio"""
+        # Approximate search: an IVF index is trained once the store reaches ann_min_size
+        # voices and retrained whenever it has grown 4x since; smaller stores use exact scans
+        index = index or os.environ.get('VOICE_INDEX', 'ivf')
+        if index not in self.INDEXES:
+            raise ValueError(f"Unknown voice index '{index}', expected one of {list(self.INDEXES)}")
+        self.index = index
+        self.ann_min_size = ann_min_size
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self._ivf: Optional[IVFIndex] = None
+        if self.index == 'ivf' and self.store.count:
+            self._update_index(np.zeros(0, dtype=np.int64), np.zeros((0, self.DIM), dtype=np.float32))
+        
+    @property
+    def voice_database(self) -> Dict[str, Dict]:
+        """Dict view of the store, built on demand (use get_voiceprint for single lookups)"""
+        return {voice_id: self.get_voiceprint(voice_id) for voice_id in self.store.voice_ids()}
+    
+    def __len__(self) -> int:
+        return self.store.live_count
+    
+    def __bool__(self) -> bool:
+        # An empty database is still a usable matcher; `if not voice_fingerprinting` means "not loaded"
+        return True
+    
+    def create_voiceprint(self, audio: Union[str, AudioBuffer]) -> np.ndarray:
+        """Create voice fingerprint from an audio file or decoded AudioBuffer"""
         try:
-            y, sr = librosa.load(audio_path, sr=16000)
-            
-            # Extract MFCC features
-            mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=20)
-            
-            # Create voiceprint (simplified - in production use more sophisticated methods)
-            voiceprint = np.mean(mfccs, axis=1)
-            
-            # Normalize
-            voiceprint = voiceprint / np.linalg.norm(voiceprint)
-            
-            return voiceprint
+            if isinstance(audio, AudioBuffer):
+                buffer = audio
+            else:
+                buffer = AudioBuffer.load(audio, sr=16000)
+            return self.voiceprint_from_buffer(buffer)
             
         except Exception as e:
             print(f"Error creating voiceprint: {e}")
             return np.zeros(20)
     
+    @staticmethod
+    def voiceprint_from_buffer(buffer: AudioBuffer) -> np.ndarray:
+        """Voiceprint of decoded audio; raises on failure instead of returning zeros"""
+        buffer = buffer.resample(16000)
+        
+        # Extract MFCC features (from the buffer's shared spectrograms)
+        mfccs = buffer.spectral_context().mfcc(20)
+        
+        # Create voiceprint (simplified - in production use more sophisticated methods)
+        voiceprint = np.mean(mfccs, axis=1)
+        
+        # Normalize
+        voiceprint = voiceprint / np.linalg.norm(voiceprint)
+        
+        return voiceprint
+    
     def match_voiceprint(self, voiceprint: np.ndarray) -> Optional[Dict]:
         """Match voiceprint against database"""
-        best_match = None
-        best_similarity = 0
+        matches = self.match_top_k(voiceprint, k=1)
+        return matches[0] if matches else None
+    
+    def match_top_k(self, voiceprint: np.ndarray, k: int = 5, n_probe: Optional[int] = None,
+                    exact: bool = False) -> List[Dict]:
+        """Return up to k enrolled voices above the similarity threshold, best first.
+        
+        Uses the IVF index when one is trained (n_probe overrides how many cells
+        are searched); exact=True always scans every voice.
+        """
+        query = self._normalize(np.asarray(voiceprint, dtype=np.float32).reshape(1, -1))[0]
+        store, rows, similarities = self._search(query, k, n_probe, exact)
+        
+        return [
+            {
+                'voice_id': store.voice_id(row),
+                'similarity': float(similarity),
+                'confidence': float(similarity)
+            }
+            for row, similarity in zip(rows.tolist(), similarities.tolist())
+            if similarity > self.similarity_threshold
+        ]
+    
+    def match_voiceprints(self, voiceprints: np.ndarray, k: int = 1, n_probe: Optional[int] = None,
+                          exact: bool = False) -> List[List[Dict]]:
+        """match_top_k for many voiceprints; exact scans share one pass over the matrix"""
+        queries = self._normalize(np.asarray(voiceprints, dtype=np.float32).reshape(-1, self.DIM))
+        if self._ivf is not None and self._ivf.is_trained and not exact:
+            searches = [self._search(query, k, n_probe) for query in queries]
+        else:
+            store, batch = self._search_exact_batch(queries, k)
+            searches = [(store, rows, similarities) for rows, similarities in batch]
         
-        for voice_id, stored_voiceprint in self.voice_database.items():
-            similarity = np.dot(voiceprint, stored_voiceprint)
-            
-            if similarity > best_similarity and similarity > self.similarity_threshold:
-                best_similarity = similarity
-                best_match = {
-                    'voice_id': voice_id,
+        return [
+            [
+                {
+                    'voice_id': store.voice_id(row),
                     'similarity': float(similarity),
                     'confidence': float(similarity)
                 }
+                for row, similarity in zip(rows.tolist(), similarities.tolist())
+                if similarity > self.similarity_threshold
+            ]
+            for store, rows, similarities in searches
+        ]
+    
+    def _search_exact_batch(self, queries: np.ndarray,
+                            k: int) -> Tuple[VoiceprintStore, List[Tuple[np.ndarray, np.ndarray]]]:
+        """Exact top-k for a batch of unit queries, keeping a running top-k per query over row chunks.
+        
+        Returns the store snapshot that was scanned, whose rows the results refer to.
+        """
+        with self._lock:
+            self._refresh()
+            store = self.store.snapshot()
+        
+        # The scan runs on the snapshot, so enrollments and deletes are not held up behind it
+        count = store.count
+        live = store.live
+        k = min(k, store.live_count)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        best = np.zeros((len(queries), 0), dtype=np.float32)
+        
+        for start in range(0, count if k > 0 else 0, store.CHUNK_ROWS):
+            chunk = slice(start, min(start + store.CHUNK_ROWS, count))
+            # (queries, chunk rows) similarities in one matrix product
+            similarities = store.similarities(queries.T, chunk).T
+            similarities[:, ~live[chunk]] = -np.inf
+            rows = np.broadcast_to(np.arange(chunk.start, chunk.stop), similarities.shape)
+            
+            # Merge this chunk into the running top-k
+            merged = np.concatenate([best, similarities], axis=1)
+            merged_rows = np.concatenate([best_rows, rows], axis=1)
+            if merged.shape[1] > k:
+                keep = np.argpartition(merged, merged.shape[1] - k, axis=1)[:, merged.shape[1] - k:]
+                merged = np.take_along_axis(merged, keep, axis=1)
+                merged_rows = np.take_along_axis(merged_rows, keep, axis=1)
+            best, best_rows = merged, merged_rows
+        
+        order = np.argsort(-best, axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return store, [(rows[np.isfinite(similarities)], similarities[np.isfinite(similarities)])
+                       for rows, similarities in zip(best_rows, best)]
+    
+    def _search(self, query: np.ndarray, k: int, n_probe: Optional[int] = None,
+                exact: bool = False) -> Tuple[VoiceprintStore, np.ndarray, np.ndarray]:
+        """Top-k live (rows, similarities) for a unit query, best first.
+        
+        Returns them with the store snapshot they were found in, which is what
+        the rows refer to if a compaction renumbers the store meanwhile.
+        """
+        with self._lock:
+            self._refresh()
+            store = self.store.snapshot()
+            candidates = None
+            if self._ivf is not None and self._ivf.is_trained and not exact:
+                candidates = self._ivf.candidates(query, n_probe or self.n_probe)
+        
+        # Cosine similarity to the candidate voices in one pass over their codes, on the snapshot
+        live = store.live
+        if candidates is None:
+            similarities = store.similarities(query)
+            if store.dead_count:
+                similarities[~live] = -np.inf
+            available = store.live_count
+        else:
+            candidates = candidates[live[candidates]]
+            similarities = store.similarities(query, candidates)
+            available = len(similarities)
         
-        return best_match
+        k = min(k, available)
+        if k <= 0:
+            return store, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        if k < len(similarities):
+            top = np.argpartition(similarities, len(similarities) - k)[len(similarities) - k:]
+        else:
+            top = np.arange(len(similarities))
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        rows = top if candidates is None else candidates[top]
+        return store, rows, similarities[top]
     
     def store_voiceprint(self, voice_id: str, voiceprint: np.ndarray, metadata: Dict = None):
         """Store voiceprint in database"""
-        self.voice_database[voice_id] = {
-            'voiceprint': voiceprint,
-            'metadata': metadata or {},
-            'created_at': str(np.datetime64('now'))
-        }
+        self.store_voiceprints([voice_id], np.asarray(voiceprint).reshape(1, -1), [metadata])
+    
+    def store_voiceprints(self, voice_ids: List[str], voiceprints: np.ndarray, metadata: List[Dict] = None):
+        """Store many voiceprints at once; re-enrolling an existing ID replaces its entry"""
+        vectors = self._normalize(np.asarray(voiceprints, dtype=np.float32).reshape(len(voice_ids), self.DIM))
+        metadata = metadata or [None] * len(voice_ids)
+        
+        with self._lock, self.store.writing():
+            # Index other writers' rows first, so ours are numbered after theirs
+            self._refresh(force=True)
+            rows = self.store.append(voice_ids, vectors, metadata)
+            if self.index == 'ivf':
+                self._update_index(rows, vectors)
+            self._maybe_compact()
+    
+    def delete_voiceprint(self, voice_id: str) -> bool:
+        """Remove an enrolled voice; returns False if it was not enrolled"""
+        with self._lock, self.store.writing():
+            self._refresh(force=True)
+            deleted = self.store.delete(voice_id)
+            self._maybe_compact()
+            return deleted
+    
+    def compact(self):
+        """Drop dead rows from the store and reindex the remaining ones"""
+        with self._lock, self.store.writing():
+            self._refresh(force=True)
+            self.store.compact()
+            self._reindex()
+    
+    def _maybe_compact(self):
+        """Compact once enough rows are dead; call with the lock held"""
+        if self.store.dead_count and self.store.dead_count >= self.compact_ratio * self.store.count:
+            self.store.compact()
+            self._reindex()
+    
+    def _refresh(self, force: bool = False):
+        """Pick up other processes' appends, at most once per refresh_interval unless forced;
+        call with the lock held"""
+        now = time.monotonic()
+        if not self.store.path or (not force and now - self._last_refresh < self.refresh_interval):
+            return
+        self._last_refresh = now
+        reopened, rows = self.store.refresh()
+        if reopened:
+            self._reindex()
+        elif len(rows) and self.index == 'ivf':
+            self._update_index(rows, self.store.vectors(rows))
+    
+    def _reindex(self):
+        """Reassign every row after the store renumbered them; call with the lock held"""
+        if self._ivf is not None and self._ivf.is_trained:
+            self._ivf.rebuild(self.store.matrix)
+        elif self.index == 'ivf':
+            self._update_index(np.zeros(0, dtype=np.int64), np.zeros((0, self.DIM), dtype=np.float32))
+    
+    def _update_index(self, rows: np.ndarray, vectors: np.ndarray):
+        """Insert rows into the IVF index, (re)training it as the store grows; call with the lock held"""
+        count = self.store.count
+        if self._ivf is not None and count < 4 * self._ivf.trained_size:
+            self._ivf.add(rows, vectors)
+        elif count >= self.ann_min_size:
+            if self._ivf is None:
+                self._ivf = IVFIndex(n_lists=1, n_probe=self.n_probe)
+            self._ivf.n_lists = self.n_lists or int(np.sqrt(count))
+            self._ivf.train(self.store.matrix)
+    
+    def get_voiceprint(self, voice_id: str) -> Optional[Dict]:
+        """Return the stored entry for a voice ID, or None"""
+        with self._lock:
+            self._refresh()
+            row = self.store.row_of(voice_id)
+            if row is None:
+                return None
+            return {
+                'voiceprint': np.array(self.store.vectors([row])[0]),
+                'metadata': self.store.metadata(row),
+                'created_at': self.store.created_at(row)
+            }
+    
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length (zero rows stay zero)"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
     
     def identify_scammer_network(self, voiceprint: np.ndarray) -> Dict:
         """Identify if voice matches known scammer networks"""
@@ -467,7 +2082,7 @@ class VoiceFingerprinting:
                 'is_known_scammer': True,
                 'voice_id': match['voice_id'],
                 'confidence': match['confidence'],
-                'network_info': self.voice_database[match['voice_id']].get('metadata', {})
+                'network_info': self.get_voiceprint(match['voice_id']).get('metadata', {})
             }
         else:
             return {
@@ -476,19 +2091,31 @@ class VoiceFingerprinting:
             }
 
 
+def voiceprint_from_bytes(data: bytes, filename: str = '') -> np.ndarray:
+    """Decode an uploaded clip and compute its voiceprint (top-level so process pools can run it)"""
+    return VoiceFingerprinting.voiceprint_from_buffer(AudioBuffer.from_bytes(data, sr=16000, filename=filename))
+
+
 class AdvancedFraudDetector:
     """Main advanced fraud detection system combining all models"""
     
-    def __init__(self):
+    def __init__(self, voice_fingerprinting: Optional[VoiceFingerprinting] = None):
         self.text_analyzer = BERTTextAnalyzer()
         self.audio_analyzer = LSTMAudioAnalyzer()
-        self.voice_fingerprinting = VoiceFingerprinting()
+        # Pass the process's VoiceFingerprinting so enrollments made through it are matched here
+        self.voice_fingerprinting = voice_fingerprinting if voice_fingerprinting is not None else VoiceFingerprinting()
         
     def analyze_call(self, audio_path: str, transcript: str = None) -> Dict:
         """Comprehensive call analysis using all advanced models"""
         
+        # Decode once; every audio model below shares the buffer and its spectrograms
+        try:
+            audio = AudioBuffer.load(audio_path, sr=self.audio_analyzer.sample_rate)
+        except Exception:
+            audio = audio_path  # let each analyzer report the decode error as before
+        
         # Audio analysis
-        audio_results = self.audio_analyzer.analyze_audio(audio_path)
+        audio_results = self.audio_analyzer.analyze_audio(audio)
         
         # Text analysis (if transcript available)
         text_results = None
@@ -496,7 +2123,7 @@ class AdvancedFraudDetector:
             text_results = self.text_analyzer.analyze_text(transcript)
         
         # Voice fingerprinting
-        voiceprint = self.voice_fingerprinting.create_voiceprint(audio_path)
+        voiceprint = self.voice_fingerprinting.create_voiceprint(audio)
         voice_match = self.voice_fingerprinting.match_voiceprint(voiceprint)
         
         # Combine all results
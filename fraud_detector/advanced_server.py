@@ -1,16 +1,22 @@
 import os
 import uuid
 import asyncio
-from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import JSONResponse
+import tarfile
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import aiofiles
 import json
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 
 # Import advanced models
-from advanced_models import AdvancedFraudDetector, BERTTextAnalyzer, LSTMAudioAnalyzer, VoiceFingerprinting
+from advanced_models import AdvancedFraudDetector, BERTTextAnalyzer, IncrementalTextAnalyzer, LSTMAudioAnalyzer, VoiceFingerprinting, voiceprint_from_bytes
+import numpy as np
 
 # Initialize FastAPI and Load Models ONCE on Startup
 app = FastAPI(
@@ -34,6 +40,11 @@ text_analyzer = None
 audio_analyzer = None
 voice_fingerprinting = None
 
+# Worker processes for voiceprint extraction in the batch voice endpoints
+voice_pool: Optional[ProcessPoolExecutor] = None
+VOICE_WORKERS = int(os.environ.get("VOICE_WORKERS", os.cpu_count() or 1))
+VOICE_BATCH_SIZE = int(os.environ.get("VOICE_BATCH_SIZE", 256))  # clips per insert/match operation
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
@@ -53,6 +64,9 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# Incremental text analyzers for live calls, keyed by job ID
+text_sessions: Dict[str, IncrementalTextAnalyzer] = {}
+
 # Directory for file uploads
 UPLOADS_DIR = "uploads"
 os.makedirs(UPLOADS_DIR, exist_ok=True)
@@ -60,11 +74,15 @@ os.makedirs(UPLOADS_DIR, exist_ok=True)
 @app.on_event("startup")
 async def startup_event():
     """Initialize all AI models on startup"""
-    global advanced_detector, text_analyzer, audio_analyzer, voice_fingerprinting
+    global advanced_detector, text_analyzer, audio_analyzer, voice_fingerprinting, voice_pool
     
     print("🚀 Initializing Advanced Fraud Detection Models...")
     
     try:
+        # Spawned before any model loads: forking after torch has started its threads can
+        # deadlock the workers, and forked workers would copy the loaded models for nothing
+        voice_pool = ProcessPoolExecutor(max_workers=VOICE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        
         print("📝 Loading BERT Text Analyzer...")
         text_analyzer = BERTTextAnalyzer()
         
@@ -75,7 +93,7 @@ async def startup_event():
         voice_fingerprinting = VoiceFingerprinting()
         
         print("🧠 Loading Advanced Fraud Detector...")
-        advanced_detector = AdvancedFraudDetector()
+        advanced_detector = AdvancedFraudDetector(voice_fingerprinting=voice_fingerprinting)
         
         print("✅ All models loaded successfully!")
         print("🔥 Cybercup25 Advanced Fraud Detection System Ready!")
@@ -84,6 +102,12 @@ async def startup_event():
         print(f"❌ Error loading models: {e}")
         print("⚠️ Running in fallback mode with basic detection")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the voiceprint worker processes"""
+    if voice_pool:
+        voice_pool.shutdown(cancel_futures=True)
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -161,6 +185,28 @@ async def analyze_text_only(text: str):
             "risk_level": "low"
         }
 
+@app.post("/analyze/text/batch")
+async def analyze_text_batch(texts: List[str]):
+    """Analyze many texts in one batched BERT pass"""
+    try:
+        if not text_analyzer:
+            return {"error": "Text analyzer not available", "results": []}
+
+        # The batched BERT pass runs in a thread so websockets and streaming responses keep being served
+        results = await asyncio.get_running_loop().run_in_executor(None, text_analyzer.analyze_texts, texts)
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "analysis_type": "text_batch",
+            "count": len(results),
+            "results": results
+        }
+
+    except Exception as e:
+        return {
+            "error": str(e),
+            "results": []
+        }
+
 @app.post("/analyze/audio/")
 async def analyze_audio_only(file: UploadFile = File(...)):
     """Analyze audio for fraud indicators using LSTM"""
@@ -233,6 +279,216 @@ async def match_voiceprint(file: UploadFile = File(...)):
             "voice_match": None
         }
 
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+
+def archive_clips(file: UploadFile) -> Iterator[tuple]:
+    """(path, bytes) for each file in an uploaded tar archive"""
+    # Stream mode reads the spooled upload member by member instead of loading it whole
+    with tarfile.open(fileobj=file.file, mode="r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, archive.extractfile(member).read()
+
+async def iter_voice_clips(files: List[UploadFile]) -> AsyncIterator[tuple]:
+    """(name, bytes) for every uploaded clip, expanding .tar/.tar.gz/.tgz archives"""
+    loop = asyncio.get_running_loop()
+    for index, file in enumerate(files):
+        name = file.filename or f"clip_{index}"
+        if name.endswith(ARCHIVE_SUFFIXES):
+            # Decompression runs in a thread so large archives do not block the loop
+            members = archive_clips(file)
+            while (clip := await loop.run_in_executor(None, next, members, None)) is not None:
+                yield clip
+        else:
+            yield name, await file.read()
+
+async def read_voice_clips(files: List[UploadFile]) -> AsyncIterator[List[tuple]]:
+    """Uploaded clips in batches of VOICE_BATCH_SIZE, so only one batch is held in memory"""
+    batch = []
+    try:
+        async for clip in iter_voice_clips(files):
+            batch.append(clip)
+            if len(batch) == VOICE_BATCH_SIZE:
+                yield batch
+                batch = []
+    except Exception:
+        # Hand over the clips read before a corrupt archive, then report it
+        if batch:
+            yield batch
+        raise
+    if batch:
+        yield batch
+
+async def extract_voiceprints(clips: List[tuple]) -> List:
+    """Voiceprint (or the exception raised) for each clip, extracted in the worker pool"""
+    loop = asyncio.get_running_loop()
+    tasks = [loop.run_in_executor(voice_pool, voiceprint_from_bytes, data, name) for name, data in clips]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+def default_voice_id(clip_name: str) -> str:
+    """Voice ID for a clip enrolled without an explicit one: its path without extension.
+
+    The path is kept so a/alice.wav and b/alice.wav in one archive get different IDs.
+    """
+    return os.path.splitext(clip_name)[0]
+
+def voice_id_error(voice_id) -> Optional[str]:
+    """Why the voiceprint store would reject a voice ID, or None if it is accepted"""
+    if not isinstance(voice_id, str):
+        return f"Voice ID must be a string, got {type(voice_id).__name__}"
+    if len(voice_id.encode("utf-8")) > voice_fingerprinting.store.ID_SIZE:
+        return f"Voice ID longer than {voice_fingerprinting.store.ID_SIZE} bytes"
+    return None
+
+def duplicate_voice_ids(ids: List[str]) -> List[str]:
+    """Voice IDs that appear more than once in a batch request"""
+    return sorted(voice_id for voice_id, count in Counter(ids).items() if count > 1)
+
+@app.post("/voice/enroll/batch")
+async def enroll_voiceprints_batch(files: List[UploadFile] = File(...), voice_ids: Optional[str] = Form(None),
+                                   metadata: Optional[str] = Form(None)):
+    """Enroll many clips (multipart files and/or tar archives), streaming one NDJSON line per clip.
+
+    voice_ids is an optional JSON list matching the clips in order (default: clip paths
+    without extension) and must not repeat an ID; metadata is an optional JSON object stored
+    with every clip. Clips are read and enrolled VOICE_BATCH_SIZE at a time: problems found
+    in the first batch fail the request with a 400, later ones are reported on their lines.
+    """
+    if not voice_fingerprinting:
+        return {"error": "Voice fingerprinting not available"}
+
+    seen = set()
+
+    def assign_voice_ids(batch: List[tuple], start: int) -> List[tuple]:
+        """(voice ID, problem or None) for each clip of a batch starting at clip number start"""
+        assigned = []
+        for offset, (name, _) in enumerate(batch):
+            if ids is None:
+                voice_id = default_voice_id(name)
+            elif start + offset < len(ids):
+                voice_id = ids[start + offset]
+            else:
+                assigned.append((None, f"No voice ID given for {name}"))
+                continue
+            # Clips sharing an ID would overwrite each other while all reporting enrolled
+            if voice_id in seen:
+                assigned.append((voice_id, f"Duplicate voice ID in request: {voice_id}"))
+            else:
+                seen.add(voice_id)
+                assigned.append((voice_id, None))
+        return assigned
+
+    batches = read_voice_clips(files)
+    try:
+        ids = json.loads(voice_ids) if voice_ids else None
+        shared_metadata = json.loads(metadata) if metadata else {}
+        duplicates = duplicate_voice_ids(ids or [])
+        if duplicates:
+            raise ValueError(f"Duplicate voice IDs in request: {duplicates}")
+
+        # A short first batch is the whole request, so the ID count can be checked up front
+        first = await anext(batches, [])
+        if ids is not None and len(first) < VOICE_BATCH_SIZE and len(ids) != len(first):
+            raise ValueError(f"Got {len(ids)} voice IDs for {len(first)} clips")
+        first_ids = assign_voice_ids(first, 0)
+        problems = [problem for _, problem in first_ids if problem is not None]
+        if problems:
+            raise ValueError("; ".join(problems))
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    async def results():
+        start, batch, assigned = 0, first, first_ids
+        try:
+            while batch:
+                voiceprints = await extract_voiceprints(batch)
+                # A bad ID fails only its own clip, like a clip that cannot be decoded
+                failures = [problem or voice_id_error(voice_id) or (f"{type(voiceprint).__name__}: {voiceprint}"
+                                                                    if isinstance(voiceprint, Exception) else None)
+                            for (voice_id, problem), voiceprint in zip(assigned, voiceprints)]
+                ok = [i for i, failure in enumerate(failures) if failure is None]
+
+                # One vectorized insert for every clip that produced a voiceprint, off the event loop
+                error = None
+                if ok:
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(
+                            None, voice_fingerprinting.store_voiceprints,
+                            [assigned[i][0] for i in ok],
+                            np.stack([voiceprints[i] for i in ok]),
+                            [dict(shared_metadata, source_clip=batch[i][0]) for i in ok]
+                        )
+                    except Exception as e:
+                        error = str(e)
+
+                for (name, _), (voice_id, _), failure in zip(batch, assigned, failures):
+                    failure = failure or error
+                    yield json.dumps({
+                        "clip": name,
+                        "voice_id": voice_id,
+                        "enrolled": failure is None,
+                        **({"error": failure} if failure is not None else {})
+                    }) + "\n"
+
+                start += len(batch)
+                batch = await anext(batches, [])
+                assigned = assign_voice_ids(batch, start)
+        except (tarfile.TarError, OSError) as e:
+            yield json.dumps({"error": f"Could not read clips after clip {start}: {e}"}) + "\n"
+            return
+
+        if ids is not None and start < len(ids):
+            yield json.dumps({"error": f"Got {len(ids)} voice IDs for {start} clips"}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.post("/voice/match/batch")
+async def match_voiceprints_batch(files: List[UploadFile] = File(...), top_k: int = Form(1)):
+    """Match many clips (multipart files and/or tar archives), streaming one NDJSON line per clip"""
+    if not voice_fingerprinting:
+        return {"error": "Voice fingerprinting not available"}
+    batches = read_voice_clips(files)
+    try:
+        first = await anext(batches, [])
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    async def results():
+        start, batch = 0, first
+        try:
+            while batch:
+                voiceprints = await extract_voiceprints(batch)
+                ok = [i for i, voiceprint in enumerate(voiceprints) if not isinstance(voiceprint, Exception)]
+
+                # One vectorized search for every clip that produced a voiceprint, off the event loop
+                matches = {}
+                error = None
+                if ok:
+                    try:
+                        found = await asyncio.get_running_loop().run_in_executor(
+                            None, functools.partial(voice_fingerprinting.match_voiceprints,
+                                                    np.stack([voiceprints[i] for i in ok]), k=top_k)
+                        )
+                        matches = dict(zip(ok, found))
+                    except Exception as e:
+                        error = str(e)
+
+                for i, ((name, _), voiceprint) in enumerate(zip(batch, voiceprints)):
+                    failure = f"{type(voiceprint).__name__}: {voiceprint}" if isinstance(voiceprint, Exception) else error
+                    line = {"clip": name}
+                    if failure is not None:
+                        line.update({"voice_match": None, "error": failure})
+                    else:
+                        line.update({"voice_match": matches[i][0] if matches[i] else None, "matches": matches[i]})
+                    yield json.dumps(line) + "\n"
+
+                start += len(batch)
+                batch = await anext(batches, [])
+        except (tarfile.TarError, OSError) as e:
+            yield json.dumps({"error": f"Could not read clips after clip {start}: {e}"}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @app.websocket("/ws/analyze/{job_id}")
 async def websocket_analyze_endpoint(websocket: WebSocket, job_id: str):
     """Real-time analysis via WebSocket"""
@@ -244,7 +500,26 @@ async def websocket_analyze_endpoint(websocket: WebSocket, job_id: str):
             data = await websocket.receive_text()
             message = json.loads(data)
             
-            if message.get("type") == "analyze":
+            if message.get("type") == "transcript":
+                # Live transcript chunk: update this call's incremental analysis
+                if not text_analyzer:
+                    await manager.send_json(job_id, {"status": "error", "message": "Text analyzer not available"})
+                    continue
+                
+                if job_id not in text_sessions:
+                    text_sessions[job_id] = text_analyzer.start_session()
+                # BERT runs in a thread so other calls' sockets are served meanwhile
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, text_sessions[job_id].append, message.get("text", "")
+                )
+                
+                await manager.send_json(job_id, {
+                    "status": "progress",
+                    "step": "text_analysis",
+                    "result": result
+                })
+            
+            elif message.get("type") == "analyze":
                 # Perform real-time analysis
                 await manager.send_json(job_id, {
                     "status": "analyzing",
@@ -295,7 +570,11 @@ async def websocket_analyze_endpoint(websocket: WebSocket, job_id: str):
                 })
                 
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also reached on bad messages and server errors, which would otherwise leak the session
         manager.disconnect(job_id)
+        text_sessions.pop(job_id, None)
 
 @app.get("/stats/threat-intelligence")
 async def get_threat_intelligence():
@@ -341,6 +620,11 @@ async def get_models_status():
             "voice_fingerprinting": voice_fingerprinting is not None,
             "advanced_detector": advanced_detector is not None
         },
+        "text_backend": text_analyzer.backend if text_analyzer else None,
+        "embedding_cache": {
+            "text_analyzer": text_analyzer.embedding_cache.get_stats() if text_analyzer else None,
+            "advanced_detector": advanced_detector.text_analyzer.embedding_cache.get_stats() if advanced_detector else None
+        },
         "system_status": "ready" if all([
             text_analyzer, audio_analyzer, voice_fingerprinting, advanced_detector
         ]) else "degraded"
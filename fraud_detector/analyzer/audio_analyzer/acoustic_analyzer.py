@@ -1,97 +1,288 @@
-import librosa
+import os
+
 import numpy as np
 from scipy import stats
 from scipy.signal import find_peaks
 
+from analyzer.audio_analyzer.audio_buffer import segment_samples
+from analyzer.audio_analyzer.pitch import get_pitch_estimator
+from analyzer.audio_analyzer.spectral_context import SpectralBatch, SpectralContext
+
 class AcousticAnalyzer:
     """
     Enhanced acoustic analyzer for fraud detection with comprehensive feature extraction.
     Analyzes audio characteristics that may indicate fraudulent behavior.
     """
     
-    def __init__(self):
-        """Initialize the acoustic analyzer with optimized parameters"""
+    # Features computed per profile. 'minimal' is just the acoustic fraud score,
+    # 'scoring' adds the features the fusion layer reads, 'full' is every feature.
+    FEATURE_PROFILES = {
+        "minimal": ("acoustic_fraud_score",),
+        "scoring": ("acoustic_fraud_score", "energy_spikes", "speech_rate"),
+        "full": (
+            "rms_energy", "max_amplitude", "energy_spikes", "energy_variance",
+            "pitch_variance", "pitch_mean", "spectral_centroid", "spectral_rolloff",
+            "zero_crossing_rate", "speech_rate", "pause_ratio",
+            "background_noise", "signal_to_noise_ratio", "spectral_bandwidth",
+            "stress_indicators", "voice_quality", "rhythm_irregularity",
+            "acoustic_fraud_score",
+        ),
+    }
+
+    # Features read from the result dict when computing another feature
+    FEATURE_DEPENDENCIES = {
+        "acoustic_fraud_score": (
+            "energy_spikes", "pitch_variance", "stress_indicators",
+            "voice_quality", "rhythm_irregularity",
+        ),
+    }
+
+    # Frame-level tracks analyze_chunks computes in one batched pass, and the
+    # features that read them
+    BATCH_TRACKS = {
+        "rms": (
+            "energy_spikes", "energy_variance", "speech_rate", "pause_ratio", "background_noise",
+            "signal_to_noise_ratio", "stress_indicators", "rhythm_irregularity",
+        ),
+        "zero_crossing_rate": ("zero_crossing_rate",),
+        "spectral_centroid": ("spectral_centroid", "voice_quality"),
+        "spectral_bandwidth": ("spectral_bandwidth", "voice_quality"),
+        "spectral_rolloff": ("spectral_rolloff",),
+    }
+
+    # Features that read the pitch estimator; its batch_tracks are added to the
+    # batched pass when any of them is wanted
+    PITCH_FEATURES = ("pitch_variance", "pitch_mean", "stress_indicators")
+
+    # Upper bound on the audio analyzed in one batched pass, to cap the size of
+    # the shared spectrogram
+    BATCH_SECONDS = 10
+    
+    def __init__(self, profile=None, pitch_estimator=None):
+        """
+        Initialize the acoustic analyzer with optimized parameters.
+
+        Args:
+            profile (str, optional): Default feature profile ('minimal', 'scoring'
+                or 'full'). Falls back to the AUDIO_FEATURE_PROFILE environment
+                variable, then 'full'.
+            pitch_estimator (str or object, optional): Pitch estimator for the
+                pitch features, 'piptrack' or the faster 'yin' (see
+                pitch.get_pitch_estimator). Falls back to the
+                AUDIO_PITCH_ESTIMATOR environment variable, then 'piptrack'.
+        """
         # Thresholds for fraud detection (calibrated for accuracy)
         self.ENERGY_SPIKE_THRESHOLD = 1.8  # Higher threshold for energy spikes
         self.PITCH_VARIANCE_THRESHOLD = 2000  # Threshold for pitch variance
         self.BACKGROUND_NOISE_THRESHOLD = 0.01  # Threshold for background noise
         self.SPEECH_RATE_THRESHOLD = 0.3  # Threshold for speech rate analysis
+        self.profile = profile or os.environ.get("AUDIO_FEATURE_PROFILE", "full")
+        self._resolve_profile(self.profile)
+        self.pitch_estimator = get_pitch_estimator(pitch_estimator)
         
-    def analyze_chunk(self, audio_chunk):
+    def analyze_chunk(self, audio_chunk, profile=None):
         """
         Comprehensive analysis of acoustic features for fraud detection.
 
         Args:
             audio_chunk (pydub.AudioSegment): The audio chunk to analyze.
+            profile (str, optional): Feature profile for this call; defaults to
+                the analyzer's profile.
 
         Returns:
-            dict: A dictionary of acoustic features with fraud indicators.
+            dict: A dictionary of acoustic features with fraud indicators,
+                limited to the profile's features and their dependencies.
+
+        Raises:
+            ValueError: If the profile is unknown.
         """
+        # Checked outside the try: a bad profile is a caller error, not a bad chunk
+        wanted = self._resolve_profile(profile or self.profile)
         try:
-            # Convert pydub audio segment to a numpy array for librosa
-            samples = np.array(audio_chunk.get_array_of_samples())
-            
-            # Ensure the samples are floating-point for librosa
-            if audio_chunk.sample_width == 2:
-                samples = samples.astype(np.float32) / 32768.0
-
-                # Normalize audio
-                if np.max(np.abs(samples)) > 0:
-                    samples = samples / np.max(np.abs(samples))
-
-                # Extract comprehensive features
-            features = {
-                    # Basic energy features
-                    "rms_energy": self._get_rms_energy(samples),
-                    "max_amplitude": self._get_max_amplitude(samples),
-                    "energy_spikes": self._get_energy_spikes(samples),
-                    "energy_variance": self._get_energy_variance(samples),
-                    
-                    # Pitch and frequency features
-                "pitch_variance": self._get_pitch_variance(samples, audio_chunk.frame_rate),
-                    "pitch_mean": self._get_pitch_mean(samples, audio_chunk.frame_rate),
-                    "spectral_centroid": self._get_spectral_centroid(samples, audio_chunk.frame_rate),
-                    "spectral_rolloff": self._get_spectral_rolloff(samples, audio_chunk.frame_rate),
-                    
-                    # Temporal features
-                    "zero_crossing_rate": self._get_zero_crossing_rate(samples),
-                    "speech_rate": self._get_speech_rate(samples, audio_chunk.frame_rate),
-                    "pause_ratio": self._get_pause_ratio(samples),
-                    
-                    # Background noise and quality
-                    "background_noise": self._get_background_noise(samples),
-                    "signal_to_noise_ratio": self._get_signal_to_noise_ratio(samples),
-                    "spectral_bandwidth": self._get_spectral_bandwidth(samples, audio_chunk.frame_rate),
-                    
-                    # Fraud-specific indicators
-                    "stress_indicators": self._get_stress_indicators(samples, audio_chunk.frame_rate),
-                    "voice_quality": self._get_voice_quality(samples, audio_chunk.frame_rate),
-                    "rhythm_irregularity": self._get_rhythm_irregularity(samples, audio_chunk.frame_rate)
-                }
-                
-            # Calculate fraud risk score based on acoustic features
-            features["acoustic_fraud_score"] = self._calculate_acoustic_fraud_score(features)
-            
-            return features
+            # View the pydub audio segment's PCM data as mono float32 for librosa
+            samples = segment_samples(audio_chunk)
+
+            # Normalize audio
+            peak = np.max(np.abs(samples))
+            if peak > 0:
+                samples /= peak
+
+            # Per-chunk memo: the RMS track, spectrogram and pitch track are computed
+            # at most once, however many features read them
+            return self._extract_features(SpectralContext(samples, audio_chunk.frame_rate), wanted)
 
         except Exception as e:
             print(f"Error in acoustic analysis: {e}")
-            return self._get_default_features()
+            return self._get_default_features(wanted)
 
-    def _get_rms_energy(self, y):
+    def analyze_chunks(self, chunks, profile=None):
+        """
+        Analyze many audio chunks at once, returning what analyze_chunk returns
+        for each.
+
+        Chunks are converted into one concatenated float32 buffer plus
+        boundary offsets, normalized per chunk with a reduceat over the
+        offsets, and their frame-level RMS, ZCR, spectra and pitch tracks are
+        computed in one vectorized pass (see SpectralBatch) before being split
+        back into per-chunk tracks. Empty chunks go through analyze_chunk.
+
+        Args:
+            chunks (list): pydub.AudioSegment chunks to analyze.
+            profile (str, optional): Feature profile for this call; defaults to
+                the analyzer's profile.
+
+        Returns:
+            list: One feature dict per chunk, in input order, identical to
+                analyze_chunk's.
+
+        Raises:
+            ValueError: If the profile is unknown.
+        """
+        wanted = self._resolve_profile(profile or self.profile)
+        tracks = [track for track, features in self.BATCH_TRACKS.items() if wanted.intersection(features)]
+        if wanted.intersection(self.PITCH_FEATURES):
+            tracks += [track for track in getattr(self.pitch_estimator, "batch_tracks", ()) if track not in tracks]
+
+        # Batch chunks by sample rate, in runs of at most BATCH_SECONDS
+        results = [None] * len(chunks)
+        batches = {}
+        for i, chunk in enumerate(chunks):
+            if len(chunk.raw_data) > 0:
+                batches.setdefault(chunk.frame_rate, []).append(i)
+            else:
+                results[i] = self.analyze_chunk(chunk, profile)
+
+        for sr, indices in batches.items():
+            run, run_samples = [], 0
+            for n, i in enumerate(indices):
+                samples = segment_samples(chunks[i])
+                run.append(samples)
+                run_samples += len(samples)
+                if run_samples >= self.BATCH_SECONDS * sr or n == len(indices) - 1:
+                    run_features = self._analyze_run(run, sr, wanted, tracks)
+                    for j, features in zip(indices[n + 1 - len(run):n + 1], run_features):
+                        results[j] = features if features is not None else self.analyze_chunk(chunks[j], profile)
+                    run, run_samples = [], 0
+        return results
+
+    def _analyze_run(self, run, sr, wanted, tracks):
+        """
+        Features of a run of chunks, sharing one SpectralBatch.
+
+        Args:
+            run (list): float32 sample arrays of the chunks.
+            sr (int): Sample rate shared by the chunks.
+            wanted (set): Features to compute, from _resolve_profile.
+            tracks (list): SpectralBatch tracks to compute in the batched pass.
+
+        Returns:
+            list: One feature dict per chunk, or Nones if the batched pass failed.
+        """
+        try:
+            lengths = np.array([len(samples) for samples in run])
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            samples = np.concatenate(run)
+
+            # Normalize each chunk by its own peak (dividing by 1 leaves silent chunks as they are)
+            peaks = np.maximum.reduceat(np.abs(samples), offsets)
+            samples = samples / np.repeat(np.where(peaks > 0, peaks, 1), lengths)
+
+            contexts = SpectralBatch(samples, offsets, sr).contexts(tracks)
+        except Exception as e:
+            print(f"Error in batched acoustic analysis, analyzing chunks one by one: {e}")
+            return [None] * len(run)
+
+        results = []
+        for context in contexts:
+            try:
+                results.append(self._extract_features(context, wanted))
+            except Exception as e:
+                print(f"Error in acoustic analysis: {e}")
+                results.append(self._get_default_features(wanted))
+        return results
+
+    def _extract_features(self, chunk, wanted):
+        """
+        Compute the wanted features of one chunk.
+
+        Args:
+            chunk (SpectralContext): The chunk's samples and memoized tracks.
+            wanted (set): Features to compute, from _resolve_profile.
+
+        Returns:
+            dict: The wanted features, in the full profile's order.
+        """
+        extractors = {
+            # Basic energy features
+            "rms_energy": lambda: self._get_rms_energy(chunk),
+            "max_amplitude": lambda: self._get_max_amplitude(chunk),
+            "energy_spikes": lambda: self._get_energy_spikes(chunk),
+            "energy_variance": lambda: self._get_energy_variance(chunk),
+
+            # Pitch and frequency features
+            "pitch_variance": lambda: self._get_pitch_variance(chunk),
+            "pitch_mean": lambda: self._get_pitch_mean(chunk),
+            "spectral_centroid": lambda: self._get_spectral_centroid(chunk),
+            "spectral_rolloff": lambda: self._get_spectral_rolloff(chunk),
+
+            # Temporal features
+            "zero_crossing_rate": lambda: self._get_zero_crossing_rate(chunk),
+            "speech_rate": lambda: self._get_speech_rate(chunk),
+            "pause_ratio": lambda: self._get_pause_ratio(chunk),
+
+            # Background noise and quality
+            "background_noise": lambda: self._get_background_noise(chunk),
+            "signal_to_noise_ratio": lambda: self._get_signal_to_noise_ratio(chunk),
+            "spectral_bandwidth": lambda: self._get_spectral_bandwidth(chunk),
+
+            # Fraud-specific indicators
+            "stress_indicators": lambda: self._get_stress_indicators(chunk),
+            "voice_quality": lambda: self._get_voice_quality(chunk),
+            "rhythm_irregularity": lambda: self._get_rhythm_irregularity(chunk),
+        }
+        features = {name: extract() for name, extract in extractors.items() if name in wanted}
+
+        # Calculate fraud risk score based on acoustic features
+        if "acoustic_fraud_score" in wanted:
+            features["acoustic_fraud_score"] = self._calculate_acoustic_fraud_score(features)
+
+        return features
+
+    def _resolve_profile(self, profile):
+        """
+        Expand a feature profile into the set of features to compute.
+
+        Args:
+            profile (str): Name of a profile in FEATURE_PROFILES.
+
+        Returns:
+            set: The profile's features plus everything they depend on.
+        """
+        if profile not in self.FEATURE_PROFILES:
+            raise ValueError(f"Unknown feature profile '{profile}', expected one of {list(self.FEATURE_PROFILES)}")
+        wanted = set()
+        pending = list(self.FEATURE_PROFILES[profile])
+        while pending:
+            name = pending.pop()
+            if name not in wanted:
+                wanted.add(name)
+                pending.extend(self.FEATURE_DEPENDENCIES.get(name, ()))
+        return wanted
+
+    def _get_rms_energy(self, chunk):
         """Calculate RMS energy"""
-        return float(np.sqrt(np.mean(y**2)))
+        return float(np.sqrt(np.mean(chunk.y**2)))
 
-    def _get_max_amplitude(self, y):
+    def _get_max_amplitude(self, chunk):
         """Calculate maximum amplitude"""
-        return float(np.max(np.abs(y)))
+        return float(np.max(np.abs(chunk.y)))
 
-    def _get_energy_spikes(self, y, threshold=None):
+    def _get_energy_spikes(self, chunk, threshold=None):
         """Detect energy spikes that may indicate stress or urgency"""
         if threshold is None:
             threshold = self.ENERGY_SPIKE_THRESHOLD
             
-        rms = librosa.feature.rms(y=y)[0]
+        rms = chunk.rms()
         mean_energy = np.mean(rms)
         std_energy = np.std(rms)
         
@@ -101,16 +292,15 @@ class AcousticAnalyzer:
         
         return int(spikes)
 
-    def _get_energy_variance(self, y):
+    def _get_energy_variance(self, chunk):
         """Calculate energy variance"""
-        rms = librosa.feature.rms(y=y)[0]
+        rms = chunk.rms()
         return float(np.var(rms))
 
-    def _get_pitch_variance(self, y, sr):
+    def _get_pitch_variance(self, chunk):
         """Calculate pitch variance with improved robustness"""
         try:
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr, threshold=0.1)
-            non_zero_pitches = pitches[pitches > 0]
+            non_zero_pitches = self.pitch_estimator.candidates(chunk)
             
             if len(non_zero_pitches) > 10:  # Need sufficient data
                 return float(np.var(non_zero_pitches))
@@ -118,11 +308,10 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_pitch_mean(self, y, sr):
+    def _get_pitch_mean(self, chunk):
         """Calculate mean pitch"""
         try:
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr, threshold=0.1)
-            non_zero_pitches = pitches[pitches > 0]
+            non_zero_pitches = self.pitch_estimator.candidates(chunk)
             
             if len(non_zero_pitches) > 0:
                 return float(np.mean(non_zero_pitches))
@@ -130,35 +319,35 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_spectral_centroid(self, y, sr):
+    def _get_spectral_centroid(self, chunk):
         """Calculate spectral centroid"""
         try:
-            spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
+            spectral_centroids = chunk.spectral_centroid()
             return float(np.mean(spectral_centroids))
         except:
             return 0.0
 
-    def _get_spectral_rolloff(self, y, sr):
+    def _get_spectral_rolloff(self, chunk):
         """Calculate spectral rolloff"""
         try:
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
+            spectral_rolloff = chunk.spectral_rolloff()
             return float(np.mean(spectral_rolloff))
         except:
             return 0.0
 
-    def _get_zero_crossing_rate(self, y):
+    def _get_zero_crossing_rate(self, chunk):
         """Calculate zero crossing rate"""
         try:
-            zcr = librosa.feature.zero_crossing_rate(y)[0]
+            zcr = chunk.zero_crossing_rate()
             return float(np.mean(zcr))
         except:
             return 0.0
 
-    def _get_speech_rate(self, y, sr):
+    def _get_speech_rate(self, chunk):
         """Estimate speech rate based on energy patterns"""
         try:
             # Use energy-based voice activity detection
-            rms = librosa.feature.rms(y=y)[0]
+            rms = chunk.rms()
             energy_threshold = np.percentile(rms, 30)  # Bottom 30% as silence
             
             # Count speech segments
@@ -169,10 +358,10 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_pause_ratio(self, y):
+    def _get_pause_ratio(self, chunk):
         """Calculate ratio of pauses in speech"""
         try:
-            rms = librosa.feature.rms(y=y)[0]
+            rms = chunk.rms()
             energy_threshold = np.percentile(rms, 20)  # Bottom 20% as silence
             
             pauses = rms <= energy_threshold
@@ -182,20 +371,20 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_background_noise(self, y):
+    def _get_background_noise(self, chunk):
         """Estimate background noise level"""
         try:
-            rms = librosa.feature.rms(y=y)[0]
+            rms = chunk.rms()
             # Use bottom 10% as noise floor
             noise_level = np.percentile(rms, 10)
             return float(noise_level)
         except:
             return 0.0
 
-    def _get_signal_to_noise_ratio(self, y):
+    def _get_signal_to_noise_ratio(self, chunk):
         """Calculate signal-to-noise ratio"""
         try:
-            rms = librosa.feature.rms(y=y)[0]
+            rms = chunk.rms()
             signal_level = np.mean(rms)
             noise_level = np.percentile(rms, 10)
             
@@ -206,20 +395,20 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_spectral_bandwidth(self, y, sr):
+    def _get_spectral_bandwidth(self, chunk):
         """Calculate spectral bandwidth"""
         try:
-            spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)[0]
+            spectral_bandwidth = chunk.spectral_bandwidth()
             return float(np.mean(spectral_bandwidth))
         except:
             return 0.0
 
-    def _get_stress_indicators(self, y, sr):
+    def _get_stress_indicators(self, chunk):
         """Detect stress indicators in voice"""
         try:
             # High pitch variance and energy spikes indicate stress
-            pitch_var = self._get_pitch_variance(y, sr)
-            energy_spikes = self._get_energy_spikes(y)
+            pitch_var = self._get_pitch_variance(chunk)
+            energy_spikes = self._get_energy_spikes(chunk)
             
             # Normalize and combine
             stress_score = min(1.0, (pitch_var / 5000) + (energy_spikes / 20))
@@ -227,12 +416,12 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_voice_quality(self, y, sr):
+    def _get_voice_quality(self, chunk):
         """Assess voice quality (lower values may indicate poor quality or manipulation)"""
         try:
             # Use spectral centroid and bandwidth as quality indicators
-            spectral_centroid = self._get_spectral_centroid(y, sr)
-            spectral_bandwidth = self._get_spectral_bandwidth(y, sr)
+            spectral_centroid = self._get_spectral_centroid(chunk)
+            spectral_bandwidth = self._get_spectral_bandwidth(chunk)
             
             # Normalize quality score
             quality_score = min(1.0, (spectral_centroid / 4000) + (spectral_bandwidth / 2000))
@@ -240,11 +429,11 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_rhythm_irregularity(self, y, sr):
+    def _get_rhythm_irregularity(self, chunk):
         """Detect irregular rhythm patterns"""
         try:
             # Use energy-based rhythm analysis
-            rms = librosa.feature.rms(y=y)[0]
+            rms = chunk.rms()
             
             # Find peaks in energy (rhythm markers)
             peaks, _ = find_peaks(rms, height=np.mean(rms))
@@ -287,9 +476,19 @@ class AcousticAnalyzer:
         except:
             return 0.0
 
-    def _get_default_features(self):
-        """Return default features in case of error"""
-        return {
+    def _get_default_features(self, wanted=None):
+        """
+        Return default features in case of error.
+
+        Args:
+            wanted (set, optional): Features to return, from _resolve_profile;
+                defaults to all of them.
+
+        Returns:
+            dict: Zeroed values for the wanted features, keyed like
+                _extract_features' result.
+        """
+        defaults = {
             "rms_energy": 0.0,
             "max_amplitude": 0.0,
             "energy_spikes": 0,
@@ -308,4 +507,7 @@ class AcousticAnalyzer:
             "voice_quality": 0.0,
             "rhythm_irregularity": 0.0,
             "acoustic_fraud_score": 0.0
-        }
\ No newline at end of file
+        }
+        if wanted is None:
+            return defaults
+        return {name: value for name, value in defaults.items() if name in wanted}
\ No newline at end of file
@@ -0,0 +1,294 @@
+import math
+
+import librosa
+import numpy as np
+
+from analyzer.audio_analyzer.acoustic_analyzer import AcousticAnalyzer
+
+
+class RunningMoments:
+    """
+    Running count, mean and variance of a stream of values (Welford's
+    algorithm, merged a block at a time with Chan et al.'s update).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, values):
+        """
+        Fold a block of values into the running moments.
+
+        Args:
+            values (np.ndarray): New values.
+        """
+        n = len(values)
+        if n == 0:
+            return
+        values = np.asarray(values, dtype=np.float64)
+        block_mean = float(np.mean(values))
+        block_m2 = float(np.sum((values - block_mean) ** 2))
+
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += block_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        """Population variance (as np.var)"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        """Population standard deviation (as np.std)"""
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    Fixed-size quantile sketch of non-negative values with log-spaced
+    buckets (DDSketch-style).
+
+    Every value above min_value lands in the bucket whose bounds are within
+    a factor of gamma = (1 + a) / (1 - a) of each other, so quantiles come
+    back with relative error at most a (the relative accuracy). Values at or
+    below min_value are counted exactly in a separate zero bucket. Memory and
+    query cost depend on the value range and accuracy only, never on how
+    many values were added.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-7, max_value=1.0):
+        """
+        Args:
+            relative_accuracy (float): Relative error bound a of quantiles.
+            min_value (float): Values at or below this are counted as zero.
+            max_value (float): Largest value tracked; larger values are
+                counted in the top bucket.
+        """
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.min_value = min_value
+        self._log_gamma = math.log(self.gamma)
+        self._offset = math.floor(math.log(min_value) / self._log_gamma)
+        self._counts = np.zeros(math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 1, dtype=np.int64)
+        self.zeros = 0
+        self.count = 0
+        self._cumulative = None
+
+    def _bucket(self, values):
+        """Bucket index of each value above min_value"""
+        index = np.ceil(np.log(values) / self._log_gamma).astype(np.int64) - self._offset
+        return np.clip(index, 1, len(self._counts) - 1)
+
+    def add(self, values):
+        """
+        Add a block of values to the sketch.
+
+        Args:
+            values (np.ndarray): Non-negative values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > self.min_value]
+        self.zeros += len(values) - len(positive)
+        self.count += len(values)
+        if len(positive):
+            self._counts += np.bincount(self._bucket(positive), minlength=len(self._counts))
+            self._cumulative = None
+
+    @property
+    def cumulative(self):
+        """Running total of the bucket counts, cached until the next add"""
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self._counts)
+        return self._cumulative
+
+    def quantile(self, q):
+        """
+        Approximate q-quantile of the values added so far.
+
+        Values are assumed log-uniformly spread within a bucket, so the
+        estimate moves smoothly with q instead of jumping between bucket
+        bounds.
+
+        Args:
+            q (float): Quantile in [0, 1] (np.percentile(values, 100 * q)).
+
+        Returns:
+            float: The estimate, 0.0 for an empty sketch.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1) - self.zeros
+        if rank < 0:
+            return 0.0
+        bucket = min(int(np.searchsorted(self.cumulative, rank, side='right')), len(self._counts) - 1)
+        below = self.cumulative[bucket] - self._counts[bucket]
+        position = (rank - below + 0.5) / max(self._counts[bucket], 1)
+        return self.gamma ** (bucket + self._offset - 1 + min(position, 1.0))
+
+    def rank(self, value):
+        """
+        Approximate number of values added so far that are <= value.
+
+        The inverse of quantile: values in value's bucket are counted in
+        proportion to where value falls within the bucket (in log space).
+
+        Args:
+            value (float): Threshold.
+
+        Returns:
+            float: The estimated count.
+        """
+        if value <= self.min_value:
+            return float(self.zeros) if value >= 0 else 0.0
+        position = math.log(value) / self._log_gamma - self._offset
+        bucket = min(max(math.ceil(position), 1), len(self._counts) - 1)
+        fraction = min(max(position - (bucket - 1), 0.0), 1.0)
+        return self.zeros + float(self.cumulative[bucket] - self._counts[bucket]) + fraction * self._counts[bucket]
+
+
+class AcousticStream(AcousticAnalyzer):
+    """
+    Streaming variant of AcousticAnalyzer for live calls.
+
+    PCM blocks of any size are fed as they arrive. Samples that do not yet
+    fill a frame are carried over in a small overlap buffer, and each complete
+    frame's RMS energy updates running moments and a quantile sketch. The
+    energy features are then answered from those summaries in constant time,
+    without re-scanning the call so far. They describe the call fed so far
+    exactly as analyze_chunk would describe it as one chunk (same framing,
+    same peak normalization), up to the sketch's relative accuracy.
+    """
+
+    # Features a stream can answer from its running summaries
+    STREAM_FEATURES = (
+        "energy_spikes", "energy_variance", "speech_rate", "pause_ratio",
+        "background_noise", "signal_to_noise_ratio",
+    )
+
+    def __init__(self, frame_length=2048, hop_length=512, relative_accuracy=0.002, profile=None):
+        """
+        Args:
+            frame_length (int): RMS frame length, as librosa.feature.rms.
+            hop_length (int): Hop between frames, as librosa.feature.rms.
+            relative_accuracy (float): Relative error bound of the percentile
+                estimates (noise floor, pause and speech thresholds).
+            profile (str, optional): Feature profile for analyze_chunk calls
+                made through this object (see AcousticAnalyzer).
+        """
+        super().__init__(profile)
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.peak = 0.0
+        self.samples = 0
+
+        # Overlap buffer: the samples not yet consumed by a complete frame (always
+        # fewer than frame_length). Framing is centered like librosa's, so the
+        # stream starts with frame_length // 2 zeros.
+        self._overlap = np.zeros(frame_length, dtype=np.float32)
+        self._filled = frame_length // 2
+        self._odd_byte = b""
+
+    def feed(self, block):
+        """
+        Add a block of audio to the stream.
+
+        Args:
+            block (bytes or np.ndarray): Mono 16-bit little-endian PCM bytes
+                (blocks may split a sample), int16 samples, or float samples
+                in [-1, 1].
+        """
+        if isinstance(block, (bytes, bytearray, memoryview)):
+            data = self._odd_byte + bytes(block)
+            usable = len(data) - len(data) % 2
+            self._odd_byte = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+        else:
+            samples = np.asarray(block)
+            if samples.dtype.kind in 'iu':
+                samples = samples.astype(np.float32) / 32768.0
+            else:
+                samples = samples.astype(np.float32, copy=False)
+        if len(samples) == 0:
+            return
+
+        self.peak = max(self.peak, float(np.max(np.abs(samples))))
+        self.samples += len(samples)
+
+        # Frame the carried-over samples plus the new block, then carry the rest over
+        data = np.concatenate((self._overlap[:self._filled], samples))
+        n_frames = 1 + (len(data) - self.frame_length) // self.hop_length if len(data) >= self.frame_length else 0
+        if n_frames:
+            frames = librosa.util.frame(data, frame_length=self.frame_length, hop_length=self.hop_length)[:, :n_frames]
+            rms = np.sqrt(np.mean(np.abs(frames) ** 2, axis=-2))
+            self.moments.add(rms)
+            self.sketch.add(rms)
+        rest = data[n_frames * self.hop_length:]
+        self._overlap[:len(rest)] = rest
+        self._filled = len(rest)
+
+    @property
+    def frames(self):
+        """Number of complete frames seen so far"""
+        return self.moments.count
+
+    def energy_spikes(self, threshold=None):
+        """Number of frames whose energy exceeds mean + threshold * std"""
+        if threshold is None:
+            threshold = self.ENERGY_SPIKE_THRESHOLD
+        if self.frames == 0:
+            return 0
+        return int(round(self.frames - self.sketch.rank(self.moments.mean + threshold * self.moments.std)))
+
+    def energy_variance(self):
+        """Variance of the (peak-normalized) frame energy"""
+        return self.moments.variance / self._scale ** 2
+
+    def speech_rate(self):
+        """Fraction of frames above the 30th-percentile energy"""
+        if self.frames == 0:
+            return 0.0
+        return (self.frames - self.sketch.rank(self.sketch.quantile(0.30))) / self.frames
+
+    def pause_ratio(self):
+        """Fraction of frames at or below the 20th-percentile energy"""
+        if self.frames == 0:
+            return 0.0
+        return self.sketch.rank(self.sketch.quantile(0.20)) / self.frames
+
+    def background_noise(self):
+        """Noise floor: 10th-percentile (peak-normalized) frame energy"""
+        return self.sketch.quantile(0.10) / self._scale
+
+    def signal_to_noise_ratio(self):
+        """Mean frame energy over the noise floor, in dB"""
+        noise_level = self.sketch.quantile(0.10)
+        if noise_level > 0:
+            return 20 * math.log10(self.moments.mean / noise_level)
+        return 0.0
+
+    def features(self):
+        """
+        Current values of all stream features.
+
+        Returns:
+            dict: STREAM_FEATURES mapped to their values for the call so far.
+        """
+        return {
+            "energy_spikes": int(self.energy_spikes()),
+            "energy_variance": float(self.energy_variance()),
+            "speech_rate": float(self.speech_rate()),
+            "pause_ratio": float(self.pause_ratio()),
+            "background_noise": float(self.background_noise()),
+            "signal_to_noise_ratio": float(self.signal_to_noise_ratio()),
+        }
+
+    @property
+    def _scale(self):
+        """Peak normalization factor analyze_chunk would apply (1 for silence)"""
+        return self.peak if self.peak > 0 else 1.0
@@ -0,0 +1,145 @@
+import io
+import os
+import tempfile
+
+import librosa
+import numpy as np
+
+from analyzer.audio_analyzer.spectral_context import SpectralContext
+
+# NumPy dtype of pydub's raw PCM data, by sample width in bytes
+PCM_DTYPES = {1: np.int8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+
+
+def segment_samples(segment, sr=None, mono=True):
+    """
+    Float32 samples of a pydub AudioSegment, read straight from its raw data.
+
+    The PCM bytes are viewed with np.frombuffer in the dtype matching the
+    segment's sample width (no copy) and scaled to [-1, 1) in one pass that
+    allocates the float32 result, the only copy made. The segment is
+    downmixed or resampled only when it is not already in the requested
+    layout, so chunks cut from audio converted once up front (see
+    AudioIngester) are never converted again.
+
+    Args:
+        segment (pydub.AudioSegment): The audio to convert.
+        sr (int, optional): Target sample rate; None keeps the segment's.
+        mono (bool): Downmix multi-channel audio to mono. If False, the
+            channels stay interleaved.
+
+    Returns:
+        np.ndarray: float32 samples.
+    """
+    if mono and segment.channels > 1:
+        segment = segment.set_channels(1)
+    if sr is not None and segment.frame_rate != sr:
+        segment = segment.set_frame_rate(sr)
+    if segment.sample_width not in PCM_DTYPES:
+        segment = segment.set_sample_width(4)
+    pcm = np.frombuffer(segment.raw_data, dtype=PCM_DTYPES[segment.sample_width])
+    return np.multiply(pcm, np.float32(2.0 ** (1 - 8 * segment.sample_width)), dtype=np.float32)
+
+
+class AudioBuffer:
+    """
+    Decoded mono float32 audio plus its sample rate, shared across analyzers.
+
+    A call is decoded once into a buffer, and every analyzer reads the same
+    samples. Resampled copies and spectral contexts are cached on the buffer,
+    so spectrograms computed by one analyzer are reused by the next.
+    """
+
+    def __init__(self, samples, sr):
+        """
+        Args:
+            samples (np.ndarray): Mono audio samples; converted to float32.
+            sr (int): Sample rate of samples.
+        """
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sr = sr
+        self._resampled = {}
+        self._contexts = {}
+
+    @classmethod
+    def load(cls, path, sr=16000):
+        """
+        Decode an audio file to mono float32 at the given sample rate.
+
+        Args:
+            path (str): Path of the audio file.
+            sr (int): Target sample rate (None keeps the file's native rate).
+
+        Returns:
+            AudioBuffer: The decoded audio.
+        """
+        y, sr = librosa.load(path, sr=sr, mono=True)
+        return cls(y, sr)
+
+    @classmethod
+    def from_bytes(cls, data, sr=16000, filename=""):
+        """
+        Decode an in-memory audio file (e.g. an upload) to mono float32.
+
+        Formats soundfile can read (WAV, FLAC, OGG) are decoded straight from
+        memory; anything else is spilled to a temporary file for librosa's
+        fallback decoders.
+
+        Args:
+            data (bytes): Encoded audio file contents.
+            sr (int): Target sample rate (None keeps the native rate).
+            filename (str): Original file name, used for its extension.
+
+        Returns:
+            AudioBuffer: The decoded audio.
+        """
+        try:
+            y, sr = librosa.load(io.BytesIO(data), sr=sr, mono=True)
+            return cls(y, sr)
+        except Exception:
+            suffix = os.path.splitext(filename)[1]
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+                f.write(data)
+            try:
+                return cls.load(f.name, sr=sr)
+            finally:
+                os.remove(f.name)
+
+    @property
+    def duration(self):
+        """Length of the audio in seconds"""
+        return len(self.samples) / self.sr
+
+    def resample(self, sr):
+        """
+        Return this audio at the given sample rate, resampling at most once per rate.
+
+        Args:
+            sr (int): Target sample rate.
+
+        Returns:
+            AudioBuffer: self if the rate already matches, otherwise a cached copy.
+        """
+        if sr == self.sr:
+            return self
+        if sr not in self._resampled:
+            self._resampled[sr] = AudioBuffer(
+                librosa.resample(self.samples, orig_sr=self.sr, target_sr=sr), sr
+            )
+        return self._resampled[sr]
+
+    def spectral_context(self, n_fft=2048, hop_length=512):
+        """
+        Shared SpectralContext for this buffer and STFT framing.
+
+        Args:
+            n_fft (int): FFT window size.
+            hop_length (int): Hop between STFT frames.
+
+        Returns:
+            SpectralContext: The cached context for these parameters.
+        """
+        key = (n_fft, hop_length)
+        if key not in self._contexts:
+            self._contexts[key] = SpectralContext(self.samples, self.sr, n_fft=n_fft, hop_length=hop_length)
+        return self._contexts[key]
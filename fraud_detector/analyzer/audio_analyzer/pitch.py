@@ -0,0 +1,190 @@
+import os
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+import scipy.signal
+
+
+@lru_cache(maxsize=8)
+def _resampling_filter(up, down):
+    """resample_poly's default anti-aliasing filter, designed once per rate pair"""
+    max_rate = max(up, down)
+    return scipy.signal.firwin(20 * max_rate + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+
+
+def voiced_frames(rms, floor=0.1):
+    """
+    Indices of the frames loud enough to carry voiced speech.
+
+    Args:
+        rms (np.ndarray): Per-frame RMS energy.
+        floor (float): Frames at or below this fraction of the loudest
+            frame's energy are treated as silence or noise.
+
+    Returns:
+        np.ndarray: Indices of the voiced frames, ascending.
+    """
+    if len(rms) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(rms > floor * np.max(rms))
+
+
+def yin(y, sr, frames, hop_length=512, fmin=65.0, fmax=400.0, threshold=0.15, max_sr=8000):
+    """
+    Fundamental frequency of selected frames with the YIN estimator.
+
+    Audio above max_sr is resampled to max_sr first; voice pitch lives well
+    below the 4 kHz telephony band, and the short windows keep the cost per
+    frame small. Each frame is centered on frame * hop_length of the input
+    (librosa's centered framing) and spans two periods of fmin. Its
+    difference function comes from one FFT cross-correlation, is turned
+    into YIN's cumulative mean normalized difference, and the first dip
+    below threshold is refined by parabolic interpolation. Frames with no
+    such dip are aperiodic and get 0.
+
+    Args:
+        y (np.ndarray): Mono audio samples.
+        sr (int): Sample rate of y.
+        frames (np.ndarray): Indices of the frames to estimate.
+        hop_length (int): Hop between frames, in samples of y.
+        fmin (float): Lowest pitch searched, in Hz.
+        fmax (float): Highest pitch searched, in Hz.
+        threshold (float): YIN's aperiodicity threshold.
+        max_sr (int): Sample rate the estimate runs at, for audio above it.
+
+    Returns:
+        np.ndarray: Pitch of each frame in Hz, 0 for aperiodic frames.
+    """
+    frames = np.asarray(frames, dtype=np.int64)
+    rate = sr
+    if sr > max_sr:
+        factor = gcd(int(sr), int(max_sr))
+        up, down = max_sr // factor, sr // factor
+        y = scipy.signal.resample_poly(y, up, down, window=_resampling_filter(up, down))
+        rate = max_sr
+
+    min_period = max(1, int(np.floor(rate / fmax)))
+    max_period = int(np.ceil(rate / fmin))
+    window = max_period + 1
+    length = window + max_period
+
+    # Gather the voiced frames only, centered like librosa's framing
+    centers = np.round(frames * (hop_length * rate / sr)).astype(np.int64)
+    padded = np.pad(np.asarray(y, dtype=np.float64), (length // 2, length // 2 + 1))
+    x = padded[np.minimum(centers, len(padded) - length)[:, np.newaxis] + np.arange(length)]
+
+    # Difference function d(tau) = sum over the window of (x[j] - x[j + tau])^2
+    n_fft = 1 << int(np.ceil(np.log2(length + window)))
+    correlation = np.fft.irfft(
+        np.fft.rfft(x, n_fft) * np.conj(np.fft.rfft(x[:, :window], n_fft)), n_fft
+    )[:, :max_period + 1]
+    energy = np.concatenate((np.zeros((len(x), 1)), np.cumsum(x ** 2, axis=1)), axis=1)
+    shifted = energy[:, window:window + max_period + 1] - energy[:, :max_period + 1]
+    difference = energy[:, window:window + 1] + shifted - 2 * correlation
+
+    # Cumulative mean normalized difference
+    lags = np.arange(1, max_period + 1)
+    normalized = difference[:, 1:] * lags / np.maximum(np.cumsum(difference[:, 1:], axis=1), 1e-12)
+    normalized = normalized[:, min_period - 1:]
+
+    # First local minimum below the threshold, refined by parabolic interpolation
+    middle = normalized[:, 1:-1]
+    dips = (middle < threshold) & (middle < normalized[:, :-2]) & (middle <= normalized[:, 2:])
+    periodic = dips.any(axis=1)
+    tau = np.argmax(dips, axis=1) + 1
+    rows = np.arange(len(x))
+    before, at, after = normalized[rows, tau - 1], normalized[rows, tau], normalized[rows, tau + 1]
+    curvature = before - 2 * at + after
+    shift = np.where(curvature > 0, 0.5 * (before - after) / np.where(curvature > 0, curvature, 1), 0.0)
+    period = tau + min_period + shift
+    return np.where(periodic, rate / period, 0.0)
+
+
+class PiptrackPitch:
+    """
+    Pitch from librosa.piptrack over the full magnitude spectrogram.
+
+    contour() is the dominant pitch bin of each frame and candidates() every
+    non-zero pitch bin, as the analyzers have always computed them.
+    """
+
+    name = "piptrack"
+
+    # SpectralContext tracks SpectralBatch precomputes for this estimator
+    batch_tracks = ("voiced_pitches",)
+
+    def contour(self, context):
+        """Dominant pitch of each voiced frame of a SpectralContext"""
+        return context.pitch_contour()
+
+    def candidates(self, context):
+        """All non-zero pitch candidates of a SpectralContext"""
+        return context.voiced_pitches()
+
+
+class YinPitch:
+    """
+    Fast pitch from YIN on the voiced frames only, at telephony sample rates.
+
+    Frames are first gated by RMS energy (see voiced_frames), so silence and
+    background noise never reach the estimator, and no spectrogram is
+    needed. There is one pitch per periodic frame, so contour() and
+    candidates() are the same array.
+    """
+
+    name = "yin"
+    batch_tracks = ("rms",)
+
+    def __init__(self, fmin=65.0, fmax=400.0, threshold=0.15, max_sr=8000, voicing_floor=0.1):
+        """
+        Args:
+            fmin (float): Lowest pitch searched, in Hz.
+            fmax (float): Highest pitch searched, in Hz.
+            threshold (float): YIN's aperiodicity threshold.
+            max_sr (int): Audio above this rate is resampled to it first.
+            voicing_floor (float): Relative RMS energy below which frames are
+                skipped (see voiced_frames).
+        """
+        self.fmin = fmin
+        self.fmax = fmax
+        self.threshold = threshold
+        self.max_sr = max_sr
+        self.voicing_floor = voicing_floor
+
+    def contour(self, context):
+        """Pitch of each periodic voiced frame of a SpectralContext"""
+        return context.yin_pitches(self.fmin, self.fmax, self.threshold, self.max_sr, self.voicing_floor)
+
+    def candidates(self, context):
+        """Same as contour(): YIN yields one pitch per frame"""
+        return self.contour(context)
+
+
+# Pitch estimators by name
+PITCH_ESTIMATORS = {
+    "piptrack": PiptrackPitch,
+    "yin": YinPitch,
+}
+
+
+def get_pitch_estimator(estimator=None):
+    """
+    Resolve a pitch estimator for an analyzer.
+
+    Args:
+        estimator (str or object, optional): A name in PITCH_ESTIMATORS, or an
+            object with contour(context) and candidates(context) methods (and
+            optionally batch_tracks). Falls back to the AUDIO_PITCH_ESTIMATOR
+            environment variable, then 'piptrack'.
+
+    Returns:
+        object: The pitch estimator.
+    """
+    if estimator is None:
+        estimator = os.environ.get("AUDIO_PITCH_ESTIMATOR", "piptrack")
+    if not isinstance(estimator, str):
+        return estimator
+    if estimator not in PITCH_ESTIMATORS:
+        raise ValueError(f"Unknown pitch estimator '{estimator}', expected one of {list(PITCH_ESTIMATORS)}")
+    return PITCH_ESTIMATORS[estimator]()
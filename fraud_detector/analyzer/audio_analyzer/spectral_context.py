@@ -0,0 +1,310 @@
+import librosa
+import numpy as np
+import scipy.signal
+
+from analyzer.audio_analyzer.pitch import voiced_frames, yin
+
+
+def pitch_contour(pitches, magnitudes):
+    """
+    Per-frame dominant pitch from a piptrack result, keeping voiced frames only.
+
+    For each frame, picks the pitch bin with the largest magnitude (argmax
+    along the frequency axis, first bin on ties) and drops frames whose
+    dominant pitch is zero.
+
+    Args:
+        pitches (np.ndarray): Pitch matrix of shape (bins, frames).
+        magnitudes (np.ndarray): Magnitude matrix of shape (bins, frames).
+
+    Returns:
+        np.ndarray: Dominant pitch of each voiced frame, in frame order.
+    """
+    index = np.argmax(magnitudes, axis=0)
+    contour = pitches[index, np.arange(pitches.shape[1])]
+    return contour[contour > 0]
+
+
+def voiced_pitches(pitches):
+    """
+    All non-zero pitch candidates from a piptrack result.
+
+    Args:
+        pitches (np.ndarray): Pitch matrix of shape (bins, frames).
+
+    Returns:
+        np.ndarray: Flattened non-zero pitches, in row-major order.
+    """
+    return pitches[pitches > 0]
+
+
+class SpectralContext:
+    """
+    Shared, lazily computed spectral representations of one audio signal.
+
+    Features ask the context for the STFT-derived data they need instead of
+    calling librosa on the raw samples, so the magnitude spectrogram, mel
+    spectrogram and pitch track are each computed at most once per signal.
+    The framing matches librosa's defaults (n_fft=2048, hop_length=512), so
+    features computed through the context equal those computed from y.
+    """
+
+    def __init__(self, y, sr, n_fft=2048, hop_length=512):
+        """
+        Args:
+            y (np.ndarray): Mono audio samples.
+            sr (int): Sample rate of y.
+            n_fft (int): FFT window size for the shared STFT.
+            hop_length (int): Hop between STFT frames.
+        """
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self._cache = {}
+
+    def _get(self, key, compute):
+        """Return the cached value for key, computing it on first use"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def prime(self, key, value):
+        """Store a value computed elsewhere (e.g. by a SpectralBatch) under key"""
+        self._cache[key] = value
+
+    @property
+    def magnitude(self):
+        """Magnitude spectrogram |STFT(y)|"""
+        return self._get('magnitude', lambda: np.abs(
+            librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length)
+        ))
+
+    @property
+    def power(self):
+        """Power spectrogram |STFT(y)|^2"""
+        return self._get('power', lambda: self.magnitude ** 2)
+
+    @property
+    def mel(self):
+        """Mel power spectrogram"""
+        return self._get('mel', lambda: librosa.feature.melspectrogram(S=self.power, sr=self.sr))
+
+    @property
+    def mel_db(self):
+        """Log-power (dB) mel spectrogram, as used by MFCCs and onset strength"""
+        return self._get('mel_db', lambda: librosa.power_to_db(self.mel))
+
+    def mfcc(self, n_mfcc=13):
+        """MFCC matrix of shape (n_mfcc, frames)"""
+        return self._get(('mfcc', n_mfcc), lambda: librosa.feature.mfcc(S=self.mel_db, n_mfcc=n_mfcc))
+
+    def piptrack(self, threshold=0.1):
+        """(pitches, magnitudes) from librosa.piptrack on the shared magnitude spectrogram"""
+        return self._get(('piptrack', threshold), lambda: librosa.piptrack(
+            S=self.magnitude, sr=self.sr, threshold=threshold
+        ))
+
+    def pitch_contour(self, threshold=0.1):
+        """Dominant pitch of each voiced frame (see pitch_contour)"""
+        return self._get(('pitch_contour', threshold), lambda: pitch_contour(*self.piptrack(threshold)))
+
+    def voiced_pitches(self, threshold=0.1):
+        """All non-zero pitch candidates (see voiced_pitches)"""
+        return self._get(('voiced_pitches', threshold), lambda: voiced_pitches(self.piptrack(threshold)[0]))
+
+    def yin_pitches(self, fmin=65.0, fmax=400.0, threshold=0.15, max_sr=8000, voicing_floor=0.1):
+        """Pitch of each periodic voiced frame from YIN (see pitch.yin), without the spectrogram"""
+        def compute():
+            # rms() frames at librosa's default hop of 512
+            pitches = yin(self.y, self.sr, voiced_frames(self.rms(), voicing_floor), hop_length=512,
+                          fmin=fmin, fmax=fmax, threshold=threshold, max_sr=max_sr)
+            return pitches[pitches > 0]
+        return self._get(('yin_pitches', fmin, fmax, threshold, max_sr, voicing_floor), compute)
+
+    def spectral_centroid(self):
+        """Per-frame spectral centroid"""
+        return self._get('spectral_centroid', lambda: librosa.feature.spectral_centroid(
+            S=self.magnitude, sr=self.sr
+        )[0])
+
+    def spectral_bandwidth(self):
+        """Per-frame spectral bandwidth"""
+        return self._get('spectral_bandwidth', lambda: librosa.feature.spectral_bandwidth(
+            S=self.magnitude, sr=self.sr, centroid=self.spectral_centroid()[np.newaxis]
+        )[0])
+
+    def spectral_rolloff(self):
+        """Per-frame spectral rolloff frequency"""
+        return self._get('spectral_rolloff', lambda: librosa.feature.spectral_rolloff(
+            S=self.magnitude, sr=self.sr
+        )[0])
+
+    def onset_envelope(self):
+        """Onset strength envelope for beat tracking (median across bands, as beat_track(y=...) uses)"""
+        return self._get('onset_envelope', lambda: librosa.onset.onset_strength(
+            S=self.mel_db, sr=self.sr, aggregate=np.median
+        ))
+
+    def rms(self):
+        """Per-frame RMS energy (time domain, as librosa.feature.rms(y=y))"""
+        return self._get('rms', lambda: librosa.feature.rms(y=self.y)[0])
+
+    def zero_crossing_rate(self):
+        """Per-frame zero crossing rate (time domain)"""
+        return self._get('zero_crossing_rate', lambda: librosa.feature.zero_crossing_rate(self.y)[0])
+
+
+class SpectralBatch:
+    """
+    Frame-level tracks of several signals, computed in one pass over a single
+    concatenated buffer.
+
+    Each signal is laid out in its own hop-aligned region of the buffer,
+    padded by n_fft // 2 on both sides exactly as librosa's centered framing
+    pads it, so framing the whole buffer once yields every signal's frames.
+    Frames that straddle two regions are dropped before any spectral work.
+    Tracks are indexed by kept frame, signal after signal, and are
+    bit-identical to those a SpectralContext computes for each signal alone.
+    """
+
+    def __init__(self, y, offsets, sr, n_fft=2048, hop_length=512):
+        """
+        Args:
+            y (np.ndarray): Concatenated mono samples of every signal.
+            offsets (np.ndarray): Start of each signal in y, ascending; each
+                signal runs to the next offset (the last to the end of y).
+                Signals must be non-empty.
+            sr (int): Sample rate shared by all signals.
+            n_fft (int): FFT window size for the shared STFT.
+            hop_length (int): Hop between STFT frames.
+        """
+        self.y = y
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.diff(np.append(self.offsets, len(y)))
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self._cache = {}
+
+        # Hop-aligned region per signal, and the frames of each region that a
+        # centered analysis of the signal alone would produce
+        self._regions = -(-(self.lengths + n_fft) // hop_length) * hop_length
+        self._region_starts = np.concatenate(([0], np.cumsum(self._regions)[:-1]))
+        self.frame_counts = 1 + self.lengths // hop_length
+        self.frame_offsets = np.concatenate(([0], np.cumsum(self.frame_counts)[:-1]))
+        self._frames = (np.repeat(self._region_starts // hop_length - self.frame_offsets, self.frame_counts)
+                        + np.arange(self.frame_counts.sum()))
+
+    def _get(self, key, compute):
+        """Return the cached value for key, computing it on first use"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _padded(self, mode):
+        """
+        Concatenated buffer with every signal padded like librosa's centered framing.
+
+        Args:
+            mode (str): 'constant' pads with zeros (STFT, RMS), 'edge' repeats
+                each signal's end samples (ZCR).
+
+        Returns:
+            np.ndarray: The padded buffer, one region per signal.
+        """
+        def pad():
+            half = self.n_fft // 2
+            padded = np.zeros(self._regions.sum(), dtype=self.y.dtype)
+            padded[np.arange(len(self.y)) + np.repeat(self._region_starts + half - self.offsets, self.lengths)] = self.y
+            if mode == 'edge':
+                heads = (self._region_starts[:, np.newaxis] + np.arange(half)).ravel()
+                padded[heads] = np.repeat(self.y[self.offsets], half)
+                padded[heads + np.repeat(half + self.lengths, half)] = np.repeat(self.y[self.offsets + self.lengths - 1], half)
+            return padded
+        return self._get(('padded', mode), pad)
+
+    @property
+    def magnitude(self):
+        """Magnitude spectrogram of the kept frames, computed as librosa.stft computes each column"""
+        def compute():
+            frames = librosa.util.frame(self._padded('constant'), frame_length=self.n_fft, hop_length=self.hop_length)
+            window = librosa.util.pad_center(
+                scipy.signal.get_window('hann', self.n_fft, fftbins=True), size=self.n_fft
+            )[:, np.newaxis]
+            stft = np.empty((1 + self.n_fft // 2, len(self._frames)),
+                            dtype=librosa.util.dtype_r2c(frames.dtype), order='F')
+            fft = librosa.get_fftlib()
+            block = max(1, librosa.util.MAX_MEM_BLOCK // (self.n_fft * frames.itemsize))
+            for start in range(0, len(self._frames), block):
+                columns = self._frames[start:start + block]
+                stft[:, start:start + block] = fft.rfft(window * frames[:, columns], axis=-2)
+            return np.abs(stft)
+        return self._get('magnitude', compute)
+
+    def rms(self):
+        """Per-frame RMS energy of the kept frames"""
+        return self._get('rms', lambda: librosa.feature.rms(
+            y=self._padded('constant'), frame_length=self.n_fft, hop_length=self.hop_length, center=False
+        )[0][self._frames])
+
+    def zero_crossing_rate(self):
+        """Per-frame zero crossing rate of the kept frames (librosa pads ZCR with edge values)"""
+        return self._get('zero_crossing_rate', lambda: librosa.feature.zero_crossing_rate(
+            self._padded('edge'), frame_length=self.n_fft, hop_length=self.hop_length, center=False
+        )[0][self._frames])
+
+    def spectral_centroid(self):
+        """Per-frame spectral centroid of the kept frames"""
+        return self._get('spectral_centroid', lambda: librosa.feature.spectral_centroid(
+            S=self.magnitude, sr=self.sr
+        )[0])
+
+    def spectral_bandwidth(self):
+        """Per-frame spectral bandwidth of the kept frames"""
+        return self._get('spectral_bandwidth', lambda: librosa.feature.spectral_bandwidth(
+            S=self.magnitude, sr=self.sr, centroid=self.spectral_centroid()[np.newaxis]
+        )[0])
+
+    def spectral_rolloff(self):
+        """Per-frame spectral rolloff frequency of the kept frames"""
+        return self._get('spectral_rolloff', lambda: librosa.feature.spectral_rolloff(
+            S=self.magnitude, sr=self.sr
+        )[0])
+
+    def piptrack(self, threshold=0.1):
+        """(pitches, magnitudes) from librosa.piptrack on the kept frames"""
+        return self._get(('piptrack', threshold), lambda: librosa.piptrack(
+            S=self.magnitude, sr=self.sr, threshold=threshold
+        ))
+
+    def contexts(self, tracks=()):
+        """
+        One SpectralContext per signal, primed with the named tracks.
+
+        Args:
+            tracks (iterable): Names of the SpectralContext tracks to compute
+                in the batched pass: 'rms', 'zero_crossing_rate',
+                'spectral_centroid', 'spectral_bandwidth', 'spectral_rolloff'
+                and 'voiced_pitches' (at piptrack's 0.1 threshold). Anything
+                else is computed lazily by each context as usual.
+
+        Returns:
+            list: SpectralContext objects, in signal order.
+        """
+        tracks = set(tracks)
+        frame_tracks = {name: getattr(self, name)() for name in (
+            'rms', 'zero_crossing_rate', 'spectral_centroid', 'spectral_bandwidth', 'spectral_rolloff'
+        ) if name in tracks}
+        pitches = self.piptrack(0.1)[0] if 'voiced_pitches' in tracks else None
+
+        contexts = []
+        for offset, length, start, count in zip(self.offsets, self.lengths, self.frame_offsets, self.frame_counts):
+            context = SpectralContext(self.y[offset:offset + length], self.sr, self.n_fft, self.hop_length)
+            frames = slice(start, start + count)
+            for name, track in frame_tracks.items():
+                context.prime(name, track[frames])
+            if pitches is not None:
+                context.prime(('voiced_pitches', 0.1), voiced_pitches(pitches[:, frames]))
+            contexts.append(context)
+        return contexts
@@ -3,6 +3,8 @@ import numpy as np
 import platform
 import warnings
 
+from analyzer.audio_analyzer.audio_buffer import segment_samples
+
 class Transcriber:
     """
     Transcribes and translates audio from any language into English using
@@ -83,9 +85,10 @@ class Transcriber:
             str: The translated English text, or None if it fails.
         """
         try:
-            # Prepare audio in the format Whisper expects (16kHz mono float32)
-            audio_chunk = audio_chunk.set_frame_rate(16000).set_channels(1)
-            samples = np.array(audio_chunk.get_array_of_samples()).astype(np.float32) / 32768.0
+            # Prepare audio in the format Whisper expects (16kHz mono float32); chunks
+            # from an AudioIngester created with frame_rate=16000, channels=1 are
+            # already in that layout and are only viewed, not converted
+            samples = segment_samples(audio_chunk, sr=16000)
             
             # --- THE CORE CHANGE ---
             # Use task="translate" to get English output directly.
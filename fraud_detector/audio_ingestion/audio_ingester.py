@@ -7,12 +7,15 @@ class AudioIngester:
     Handles the ingestion and initial processing of audio files.
     Now supports MP4 and other ffmpeg-compatible formats.
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, frame_rate=None, channels=None):
         """
         Initializes the AudioIngester with the path to the media file.
 
         Args:
             file_path (str): The path to the media file (e.g., .mp4, .wav, .mp3).
+            frame_rate (int, optional): Resample the audio to this rate once, on load,
+                                        so chunks never need resampling downstream.
+            channels (int, optional): Downmix the audio to this many channels once, on load.
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"The specified file was not found: {file_path}")
@@ -21,6 +24,12 @@ class AudioIngester:
         # Use 'from_file' which can handle various formats, including mp4
         self.audio = AudioSegment.from_file(file_path)
 
+        # Convert the whole file once (downmix first, so only one channel is resampled)
+        if channels is not None:
+            self.audio = self.audio.set_channels(channels)
+        if frame_rate is not None:
+            self.audio = self.audio.set_frame_rate(frame_rate)
+
     def get_audio_chunks(self, min_silence_len=700, silence_thresh=-45, keep_silence=300):
         """
         Splits the audio into chunks based on silence. This is a form of
@@ -0,0 +1,86 @@
+"""
+Benchmark: AcousticAnalyzer.analyze_chunk in a loop versus one
+AcousticAnalyzer.analyze_chunks call over the same speech chunks.
+
+Chunks are cut from a synthetic call at random lengths, the way the audio
+ingester's silence splitting produces them. Also checks that both paths
+return identical feature dicts.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_acoustic_batch.py --minutes 5 --chunk-seconds 0.5 2 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analyzer.audio_analyzer.acoustic_analyzer import AcousticAnalyzer
+from bench_spectral_context import synthetic_call
+
+
+def speech_chunks(y, sr, mean_seconds, seed=0):
+    """Split y into 16-bit pydub chunks of random length around mean_seconds"""
+    rng = np.random.default_rng(seed)
+    pcm = (y * 32767).astype(np.int16)
+    chunks, start = [], 0
+    while start < len(pcm):
+        length = max(1, int(rng.uniform(0.5, 1.5) * mean_seconds * sr))
+        piece = pcm[start:start + length]
+        chunks.append(AudioSegment(data=piece.tobytes(), sample_width=2, frame_rate=sr, channels=1))
+        start += length
+    return chunks
+
+
+def best_of(fn, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def same(a, b):
+    return a.keys() == b.keys() and all(a[k] == b[k] or (a[k] != a[k] and b[k] != b[k]) for k in a)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--chunk-seconds", type=float, nargs="+", default=[0.5, 2, 8])
+    parser.add_argument("--profile", default="full")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    sr = 16000
+    y = synthetic_call(args.minutes * 60, sr)
+    analyzer = AcousticAnalyzer()
+
+    print(f"{args.minutes:g} min call, profile={args.profile}, best of {args.repeats}")
+    print(f"  {'chunk':>7s} {'chunks':>7s} {'loop':>9s} {'batched':>9s} {'speedup':>8s}")
+    for seconds in args.chunk_seconds:
+        chunks = speech_chunks(y, sr, seconds)
+        analyzer.analyze_chunks(chunks[:4], args.profile)  # warm up librosa caches
+
+        loop, expected = best_of(lambda: [analyzer.analyze_chunk(chunk, args.profile) for chunk in chunks],
+                                 args.repeats)
+        batched, results = best_of(lambda: analyzer.analyze_chunks(chunks, args.profile), args.repeats)
+
+        mismatches = sum(not same(a, b) for a, b in zip(results, expected))
+        if mismatches or len(results) != len(expected):
+            print(f"MISMATCH: {mismatches} of {len(chunks)} chunks differ at {seconds:g} s")
+            sys.exit(1)
+        print(f"  {seconds:6g}s {len(chunks):7d} {loop:8.2f}s {batched:8.2f}s {loop / batched:7.1f}x")
+
+    print("Batched and per-chunk results are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: per-chunk latency of AcousticAnalyzer.analyze_chunk with and
+without the per-chunk memo of intermediates.
+
+The "before" column swaps in a SpectralContext that never caches, so every
+feature recomputes its own RMS track, STFT and piptrack exactly as the
+analyzer did when each helper called librosa on the raw samples. Also checks
+that both paths return identical feature dicts.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_acoustic_memo.py --chunk-seconds 1 3 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analyzer.audio_analyzer import acoustic_analyzer
+from analyzer.audio_analyzer.acoustic_analyzer import AcousticAnalyzer
+from analyzer.audio_analyzer.spectral_context import SpectralContext
+from bench_spectral_context import synthetic_call
+
+
+class UnsharedContext(SpectralContext):
+    """SpectralContext that recomputes every intermediate on each request"""
+
+    def _get(self, key, compute):
+        return compute()
+
+
+def best_of(fn, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunk-seconds", type=float, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--profile", default="full")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    sr = 16000
+    analyzer = AcousticAnalyzer()
+    y = synthetic_call(max(args.chunk_seconds), sr)
+
+    print(f"AcousticAnalyzer.analyze_chunk, profile={args.profile}, best of {args.repeats}")
+    print(f"  {'chunk':>7s} {'before':>10s} {'memo':>10s} {'speedup':>8s}")
+    for seconds in args.chunk_seconds:
+        pcm = (y[:int(seconds * sr)] * 32767).astype(np.int16)
+        chunk = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=sr, channels=1)
+        analyzer.analyze_chunk(chunk, args.profile)  # warm up librosa caches
+
+        acoustic_analyzer.SpectralContext = UnsharedContext
+        try:
+            before, expected = best_of(lambda: analyzer.analyze_chunk(chunk, args.profile), args.repeats)
+        finally:
+            acoustic_analyzer.SpectralContext = SpectralContext
+        after, result = best_of(lambda: analyzer.analyze_chunk(chunk, args.profile), args.repeats)
+
+        if result != expected:
+            print(f"MISMATCH at {seconds:g} s: "
+                  f"{ {k: (result[k], expected[k]) for k in result if result[k] != expected[k]} }")
+            sys.exit(1)
+        print(f"  {seconds:6g}s {before * 1000:8.1f}ms {after * 1000:8.1f}ms {before / after:7.1f}x")
+
+    print("Memoized and unshared paths return identical features")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: querying the energy features of a live call through an
+AcousticStream versus re-scanning the call so far with AcousticAnalyzer.
+
+A synthetic call is fed as 16-bit PCM in fixed-size blocks (20 ms by
+default, a typical telephony packet). At a few points in the call the
+stream's features are queried and timed against a full re-scan, and at the
+end they are compared with the exact values for the same frames.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_acoustic_stream.py --minutes 10 --block-ms 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analyzer.audio_analyzer.acoustic_analyzer import AcousticAnalyzer
+from analyzer.audio_analyzer.acoustic_stream import AcousticStream
+from analyzer.audio_analyzer.spectral_context import SpectralContext
+from bench_spectral_context import synthetic_call
+
+
+def rescan(analyzer, pcm, sr, frames=None):
+    """Stream features recomputed from scratch over pcm, as analyze_chunk computes them"""
+    y = pcm.astype(np.float32) / 32768.0
+    y = y / np.max(np.abs(y))
+    context = SpectralContext(y, sr)
+    if frames is not None:
+        # The frames the stream has completed: centered framing without the
+        # end padding a finished signal would get
+        padded = np.concatenate((np.zeros(1024, dtype=np.float32), y))
+        framed = librosa.util.frame(padded, frame_length=2048, hop_length=512)[:, :frames]
+        context.prime("rms", np.sqrt(np.mean(np.abs(framed) ** 2, axis=-2)))
+    return {name: getattr(analyzer, f"_get_{name}")(context) for name in AcousticStream.STREAM_FEATURES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--block-ms", type=float, default=20)
+    parser.add_argument("--checkpoints", type=int, default=4)
+    args = parser.parse_args()
+
+    sr = 16000
+    pcm = (synthetic_call(args.minutes * 60, sr) * 32767).astype(np.int16)
+    block = int(sr * args.block_ms / 1000)
+    analyzer = AcousticAnalyzer()
+    stream = AcousticStream()
+    rescan(analyzer, pcm[:sr], sr)  # warm up librosa caches
+    checkpoints = set(np.linspace(0, len(pcm) // block, args.checkpoints + 1, dtype=int)[1:])
+
+    print(f"{args.minutes:g} min call in {args.block_ms:g} ms blocks")
+    print(f"  {'call so far':>11s} {'stream query':>13s} {'re-scan':>10s}")
+    feed_time = 0.0
+    for n in range(1, len(pcm) // block + 1):
+        data = pcm[(n - 1) * block:n * block].tobytes()
+        start = time.perf_counter()
+        stream.feed(data)
+        feed_time += time.perf_counter() - start
+        if n in checkpoints:
+            start = time.perf_counter()
+            stream.features()
+            query = time.perf_counter() - start
+            start = time.perf_counter()
+            rescan(analyzer, pcm[:n * block], sr)
+            full = time.perf_counter() - start
+            print(f"  {n * block / sr / 60:9.1f}min {query * 1e6:11.0f}us {full * 1000:8.1f}ms")
+    print(f"  feed: {feed_time / (len(pcm) // block) * 1e6:.0f} us per block")
+
+    fed = len(pcm) // block * block
+    exact = rescan(analyzer, pcm[:fed], sr, stream.frames)
+    streamed = stream.features()
+    print(f"Accuracy after {stream.frames} frames (exact vs stream)")
+    for name in AcousticStream.STREAM_FEATURES:
+        print(f"  {name:24s} {exact[name]:12.6g} {streamed[name]:12.6g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: cost of the 'minimal', 'scoring' and 'full' feature profiles in
+LSTMAudioAnalyzer.analyze_audio and AcousticAnalyzer.analyze_chunk.
+
+Also checks that every profile returns the same values as 'full' for the
+features it keeps.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_feature_profiles.py --minutes 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+from pydub import AudioSegment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from advanced_models import LSTMAudioAnalyzer
+from analyzer.audio_analyzer.acoustic_analyzer import AcousticAnalyzer
+from bench_spectral_context import synthetic_call
+
+PROFILES = ("minimal", "scoring", "full")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def check_subset(name, result, full):
+    for key, value in result.items():
+        if not np.allclose(value, full[key]):
+            print(f"MISMATCH in {name}: {key}")
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--chunk-seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    sr = 16000
+    y = synthetic_call(args.minutes * 60, sr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "call.wav")
+        sf.write(path, y, sr)
+        analyzer = LSTMAudioAnalyzer()
+        analyzer.analyze_audio(path, "minimal")  # warm up librosa caches
+
+        print(f"LSTMAudioAnalyzer.analyze_audio, {args.minutes:g} min call")
+        results = {}
+        for profile in reversed(PROFILES):
+            elapsed, results[profile] = timed(lambda: analyzer.analyze_audio(path, profile))
+            print(f"  {profile:8s} {elapsed:7.2f} s  "
+                  f"{len(results[profile]['audio_features']) + len(results[profile]['acoustic_features'])} features")
+        for profile in PROFILES:
+            check_subset(profile, results[profile]['acoustic_features'], results['full']['acoustic_features'])
+            check_subset(profile, results[profile]['audio_features'], results['full']['audio_features'])
+            assert results[profile]['fraud_score'] == results['full']['fraud_score']
+
+    pcm = (y[:int(args.chunk_seconds * sr)] * 32767).astype(np.int16)
+    chunk = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=sr, channels=1)
+    acoustic = AcousticAnalyzer()
+
+    print(f"AcousticAnalyzer.analyze_chunk, {args.chunk_seconds:g} s chunk")
+    results = {}
+    for profile in reversed(PROFILES):
+        elapsed, results[profile] = timed(lambda: acoustic.analyze_chunk(chunk, profile))
+        print(f"  {profile:8s} {elapsed * 1000:7.1f} ms  {len(results[profile])} features")
+    for profile in PROFILES:
+        check_subset(profile, results[profile], results['full'])
+
+    print("Profiles agree with 'full' on shared features")
+
+
+if __name__ == "__main__":
+    main()
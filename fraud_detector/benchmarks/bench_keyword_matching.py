@@ -0,0 +1,85 @@
+"""
+Microbenchmark: keyword counting on 10k-word transcripts.
+
+Compares the original per-keyword loops (an `in` check plus str.count for
+every keyword, then the urgency/authority lists again) with KeywordMatcher,
+and checks that both produce the same keyword scores and word counts.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_keyword_matching.py --words 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import KeywordMatcher
+
+FRAUD_KEYWORDS = {
+    'urgency': ['immediately', 'urgent', 'right now', 'hurry', 'act fast', 'limited time'],
+    'authority': ['irs', 'fbi', 'police', 'government', 'court', 'legal', 'arrest'],
+    'financial': ['bank', 'account', 'credit card', 'payment', 'transfer', 'wire', 'money'],
+    'personal_info': ['ssn', 'social security', 'otp', 'password', 'verification', 'confirm'],
+    'threats': ['sued', 'arrested', 'jail', 'prosecuted', 'legal action', 'consequences'],
+    'rewards': ['prize', 'winner', 'lottery', 'free', 'grant', 'inheritance', 'bonus']
+}
+
+VOCABULARY = (
+    "hello this is calling from the bank about your account we noticed a payment "
+    "please confirm your social security number immediately or the police will "
+    "arrest you you have won a free lottery prize the first thing is legal action "
+    "thank you for your time how are you today my name is john"
+).split()
+
+
+def original_counts(text):
+    """The pre-KeywordMatcher logic from _analyze_keywords and _extract_linguistic_features"""
+    text_lower = text.lower()
+    scores = {}
+    for category, keywords in FRAUD_KEYWORDS.items():
+        score = 0
+        for keyword in keywords:
+            if keyword in text_lower:
+                score += text_lower.count(keyword)
+        scores[category] = min(score / len(keywords), 1.0)
+
+    urgency = sum(text_lower.count(word) for word in FRAUD_KEYWORDS['urgency'])
+    authority = sum(text_lower.count(word) for word in FRAUD_KEYWORDS['authority'])
+    return scores, urgency, authority
+
+
+def matcher_counts(matcher, text):
+    """The same outputs from a single KeywordMatcher.count call"""
+    counts = matcher.count(text.lower())
+    scores = {category: min(counts[category] / len(keywords), 1.0)
+              for category, keywords in FRAUD_KEYWORDS.items()}
+    return scores, counts['urgency'], counts['authority']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    matcher = KeywordMatcher(FRAUD_KEYWORDS)
+    transcripts = {
+        'scam-heavy': " ".join(rng.choice(VOCABULARY) for _ in range(args.words)),
+        'benign': " ".join(rng.choice(VOCABULARY[-12:]) for _ in range(args.words)),
+    }
+
+    for name, text in transcripts.items():
+        assert original_counts(text) == matcher_counts(matcher, text), name
+        original = timeit.timeit(lambda: original_counts(text), number=args.repeat) / args.repeat
+        matched = timeit.timeit(lambda: matcher_counts(matcher, text), number=args.repeat) / args.repeat
+        print(f"{name:<11} {args.words} words: original {original * 1000:6.2f} ms  "
+              f"matcher {matched * 1000:6.2f} ms  speedup {original / matched:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: vectorized LSTMAudioAnalyzer._detect_pauses vs. the original
+Python loops over 100 ms slices and run lengths.
+
+Both implementations must return identical pause durations.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_pause_detection.py --minutes 60
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from advanced_models import LSTMAudioAnalyzer
+from bench_spectral_context import synthetic_call
+
+
+def loop_detect_pauses(y, sr):
+    """The original loop-based implementation, kept as the reference"""
+    frame_length = int(0.1 * sr)
+    energy = []
+    for i in range(0, len(y) - frame_length, frame_length):
+        energy.append(np.sum(y[i:i + frame_length] ** 2))
+
+    threshold = np.mean(energy) * 0.1
+    pause_durations = []
+    current_pause = 0
+    for e in energy:
+        if e < threshold:
+            current_pause += 1
+        else:
+            if current_pause > 0:
+                pause_durations.append(current_pause * 0.1)
+                current_pause = 0
+    return pause_durations
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    sr = 16000
+    # LSTMAudioAnalyzer.__init__ loads no external weights; only the method is timed
+    analyzer = LSTMAudioAnalyzer()
+
+    print(f"{'minutes':>8} {'pauses':>7} {'loop (ms)':>10} {'vectorized (ms)':>16} {'speedup':>8}")
+    for minutes in args.minutes:
+        y = synthetic_call(minutes * 60, sr)
+        loop_time, expected = best_of(lambda: loop_detect_pauses(y, sr), args.repeats)
+        fast_time, actual = best_of(lambda: analyzer._detect_pauses(y, sr), args.repeats)
+        if actual != expected:
+            print(f"MISMATCH at {minutes} min: {len(actual)} vs {len(expected)} pauses")
+            sys.exit(1)
+        print(f"{minutes:8g} {len(actual):7d} {loop_time * 1000:10.1f} {fast_time * 1000:16.1f} "
+              f"{loop_time / fast_time:7.1f}x")
+    print("Outputs match")
+
+
+if __name__ == "__main__":
+    main()
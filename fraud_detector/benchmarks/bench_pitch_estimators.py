@@ -0,0 +1,141 @@
+"""
+Benchmark: accuracy versus speed of the analyzers' pitch estimators,
+librosa.piptrack over the full STFT and YIN on voiced frames only.
+
+Each call is decoded at telephony sample rates (8 and 16 kHz). Speed is the
+time to produce the pitch features from the samples, and for piptrack also
+with the STFT already computed (as when spectral features share it).
+Accuracy is measured per frame against a reference pitch track: the known
+f0 of the --synthetic call, or librosa.pyin for recorded calls. For frames
+the reference marks voiced, it reports the median absolute error and the
+gross pitch error (share of frames more than 20% off), then the summary
+statistics the analyzers read (mean, std and range of the contour).
+
+Recorded calls need ffmpeg to decode MP4; calls that cannot be decoded are
+skipped.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_pitch_estimators.py samples/sample_negative.mp4 samples/sample_positive.mp4
+    python benchmarks/bench_pitch_estimators.py --synthetic --minutes 2
+"""
+
+import argparse
+import os
+import sys
+
+import librosa
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analyzer.audio_analyzer.audio_buffer import AudioBuffer
+from analyzer.audio_analyzer.pitch import YinPitch, voiced_frames, yin
+from analyzer.audio_analyzer.spectral_context import SpectralContext
+from bench_acoustic_batch import best_of
+from bench_spectral_context import synthetic_call
+
+FMIN, FMAX = 65.0, 400.0
+
+
+def synthetic_f0(seconds, sr):
+    """Per-frame f0 of synthetic_call (0 in its pauses), at librosa's centered hop of 512"""
+    t = np.arange(0, int(seconds * sr) + 1, 512) / sr
+    f0 = 140 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    return np.where(np.sin(2 * np.pi * 0.8 * t) > -0.3, f0, 0.0)
+
+
+def pyin_f0(y, sr):
+    """Reference f0 per frame from librosa.pyin (0 where unvoiced)"""
+    f0, voiced, _ = librosa.pyin(y, fmin=FMIN, fmax=FMAX, sr=sr, frame_length=2048, hop_length=512)
+    return np.where(voiced, f0, 0.0)
+
+
+def piptrack_frames(context):
+    """Dominant piptrack pitch of every frame (pitch_contour before dropping unvoiced frames)"""
+    pitches, magnitudes = context.piptrack()
+    return pitches[np.argmax(magnitudes, axis=0), np.arange(pitches.shape[1])]
+
+
+def yin_frames(context, estimator):
+    """YIN pitch of every frame, 0 outside the voiced frames it is run on"""
+    f0 = np.zeros(len(context.rms()))
+    frames = voiced_frames(context.rms(), estimator.voicing_floor)
+    f0[frames] = yin(context.y, context.sr, frames, fmin=estimator.fmin, fmax=estimator.fmax,
+                     threshold=estimator.threshold, max_sr=estimator.max_sr)
+    return f0
+
+
+def frame_errors(estimate, reference):
+    """Median absolute error (Hz), gross pitch error and coverage on the reference's voiced frames"""
+    n = min(len(estimate), len(reference))
+    estimate, reference = estimate[:n], reference[:n]
+    voiced = reference > 0
+    both = voiced & (estimate > 0)
+    if not both.any():
+        return float("nan"), float("nan"), 0.0
+    error = np.abs(estimate[both] - reference[both])
+    return float(np.median(error)), float(np.mean(error > 0.2 * reference[both])), float(both.sum() / voiced.sum())
+
+
+def summary(values):
+    """Mean, standard deviation and range of a pitch contour"""
+    if len(values) == 0:
+        return 0.0, 0.0, 0.0
+    return float(np.mean(values)), float(np.std(values)), float(np.max(values) - np.min(values))
+
+
+def report(name, y, sr, reference, repeats):
+    """Print speed and accuracy of each estimator on one call"""
+    estimator = YinPitch()
+    stft = SpectralContext(y, sr)
+    stft.magnitude
+
+    timings = {
+        "piptrack": best_of(lambda: SpectralContext(y, sr).pitch_contour(), repeats)[0],
+        "piptrack (STFT shared)": best_of(lambda: librosa.piptrack(S=stft.magnitude, sr=sr, threshold=0.1),
+                                          repeats)[0],
+        "yin": best_of(lambda: estimator.contour(SpectralContext(y, sr)), repeats)[0],
+    }
+    context = SpectralContext(y, sr)
+    frames = {"piptrack": piptrack_frames(context), "yin": yin_frames(context, estimator)}
+    contours = {"piptrack": context.pitch_contour(), "yin": estimator.contour(context)}
+
+    seconds = len(y) / sr
+    print(f"{name}: {seconds / 60:.1f} min at {sr} Hz, reference mean/std/range "
+          f"{'%.1f / %.1f / %.1f' % summary(reference[reference > 0])} Hz")
+    print(f"  {'estimator':24s} {'ms/min':>8s} {'speedup':>8s} {'median err':>11s} {'GPE':>6s} "
+          f"{'coverage':>9s} {'mean':>8s} {'std':>8s} {'range':>8s}")
+    for label, elapsed in timings.items():
+        method = label.split()[0]
+        median, gpe, coverage = frame_errors(frames[method], reference)
+        mean, std, spread = summary(contours[method])
+        print(f"  {label:24s} {elapsed / seconds * 60000:8.1f} {timings['piptrack'] / elapsed:7.1f}x "
+              f"{median:9.1f}Hz {gpe:6.1%} {coverage:9.1%} {mean:8.1f} {std:8.1f} {spread:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="*", default=["samples/sample_negative.mp4", "samples/sample_positive.mp4"])
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--minutes", type=float, default=2)
+    parser.add_argument("--rates", type=int, nargs="+", default=[8000, 16000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    for sr in args.rates:
+        if args.synthetic:
+            y = synthetic_call(args.minutes * 60, sr)
+            report("synthetic call", y / np.max(np.abs(y)), sr, synthetic_f0(args.minutes * 60, sr), args.repeats)
+            continue
+        for path in args.paths:
+            try:
+                y = AudioBuffer.load(path, sr=sr).samples[:int(args.minutes * 60 * sr)]
+            except Exception as e:
+                print(f"Skipping {path}: {type(e).__name__} {e}")
+                continue
+            report(os.path.basename(path), y / np.max(np.abs(y)), sr, pyin_f0(y, sr), args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: original '.*' scam-pattern search vs. ScamPatternMatcher on
+adversarial inputs.
+
+The inputs repeat the first anchor of a pattern without ever completing it,
+which makes the original unbounded '.*' search backtrack quadratically. The
+original is skipped for sizes above --max-original-kb to keep runs short.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_scam_patterns.py --max-kb 50
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import ScamPatternMatcher
+
+SCAM_PATTERNS = [
+    r'you have won.*prize',
+    r'your account will be.*closed',
+    r'pay.*or.*will be.*arrested',
+    r'confirm.*personal.*information',
+    r'click.*link.*immediately',
+    r'do not.*tell.*anyone',
+    r'act.*now.*or.*lose'
+]
+
+ADVERSARIAL_UNITS = {
+    'repeated anchors': "pay confirm click act do not you have won your account will be ",
+    'near misses': "pay or will be act now or confirm personal click link do not tell ",
+    'no whitespace': "payorwillbe",
+    'benign speech': "hello how are you doing today i wanted to ask about dinner plans ",
+}
+
+
+def original_search(text_lower):
+    """The pre-ScamPatternMatcher logic from _analyze_patterns"""
+    return [pattern for pattern in SCAM_PATTERNS if re.search(pattern, text_lower)]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-kb", type=int, default=50)
+    parser.add_argument("--max-original-kb", type=int, default=10)
+    args = parser.parse_args()
+
+    matcher = ScamPatternMatcher(SCAM_PATTERNS)
+    sizes = sorted({kb for kb in (1, 5, 10, 25, 50, args.max_kb) if kb <= args.max_kb})
+
+    print(f"{'input':<18}{'KB':>5}{'original s':>12}{'bounded s':>12}  fired (bounded)")
+    for name, unit in ADVERSARIAL_UNITS.items():
+        for kb in sizes:
+            text = (unit * (kb * 1024 // len(unit) + 1))[:kb * 1024]
+            fired, bounded_time = timed(matcher.match, text)
+            if kb <= args.max_original_kb:
+                _, original_time = timed(original_search, text)
+                original = f"{original_time:12.4f}"
+            else:
+                original = f"{'skipped':>12}"
+            print(f"{name:<18}{kb:>5}{original}{bounded_time:12.4f}  {len(fired)}")
+
+
+if __name__ == "__main__":
+    main()
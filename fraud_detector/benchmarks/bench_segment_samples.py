@@ -0,0 +1,132 @@
+"""
+Benchmark: per-chunk pydub-to-NumPy conversion, before and after
+segment_samples, on an hour-long call.
+
+Before: every chunk is resampled and downmixed by the transcriber
+(set_frame_rate/set_channels), and both the transcriber and the acoustic
+analyzer copy samples through np.array(chunk.get_array_of_samples()).
+After: the ingester converts the whole file to 16 kHz mono once, and each
+chunk's PCM bytes are viewed with np.frombuffer and scaled to float32 in
+one pass.
+
+The call is an MP4 decoded with ffmpeg and tiled to --minutes, or with
+--synthetic a 44.1 kHz stereo recording built in memory (what an MP4's AAC
+track decodes to). Chunks are cut at random 2-20 s lengths; peak memory is
+the tracemalloc peak while converting them. split_on_silence itself is
+timed separately on the first --split-minutes of the native and the
+converted audio, since converting up front also makes it cheaper.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_segment_samples.py samples/sample_negative.mp4 --minutes 60
+    python benchmarks/bench_segment_samples.py --synthetic --minutes 60
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.silence import split_on_silence
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analyzer.audio_analyzer.audio_buffer import segment_samples
+from bench_spectral_context import synthetic_call
+
+
+def load_call(args):
+    """The benchmark call as a pydub AudioSegment of --minutes"""
+    if args.synthetic:
+        sr = 44100
+        left = synthetic_call(60, sr, seed=0)
+        right = synthetic_call(60, sr, seed=1)
+        pcm = (np.stack((left, right), axis=1) * 32767).astype(np.int16)
+        audio = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=sr, channels=2)
+    else:
+        audio = AudioSegment.from_file(args.path)
+    repeats = int(np.ceil(args.minutes * 60 * 1000 / len(audio)))
+    return (audio * repeats)[:int(args.minutes * 60 * 1000)]
+
+
+def cut(audio, seed=0):
+    """Split audio into chunks of random 2-20 s lengths, one at a time"""
+    rng = np.random.default_rng(seed)
+    start = 0
+    while start < len(audio):
+        end = start + int(rng.uniform(2000, 20000))
+        yield audio[start:end]
+        start = end
+
+
+def before(chunks):
+    """Per-chunk conversions of the transcriber and acoustic analyzer before segment_samples"""
+    for chunk in chunks:
+        whisper = chunk.set_frame_rate(16000).set_channels(1)
+        yield (np.array(whisper.get_array_of_samples()).astype(np.float32) / 32768.0,
+               np.array(chunk.get_array_of_samples()).astype(np.float32) / 32768.0)
+
+
+def after(chunks):
+    """The same conversions through segment_samples, on chunks of a file converted once"""
+    for chunk in chunks:
+        yield segment_samples(chunk, sr=16000), segment_samples(chunk)
+
+
+def measure(convert, chunks):
+    """Seconds and tracemalloc peak bytes to convert every chunk, keeping one chunk alive at a time"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = samples = 0
+    for whisper, acoustic in convert(chunks):
+        count += 1
+        samples += len(whisper)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, count, samples
+
+
+def split_seconds(audio, minutes):
+    """Seconds per minute of audio that split_on_silence takes, with the ingester's defaults"""
+    start = time.perf_counter()
+    split_on_silence(audio[:int(minutes * 60000)], min_silence_len=700, silence_thresh=-45, keep_silence=300)
+    return (time.perf_counter() - start) / minutes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", default="samples/sample_negative.mp4")
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--split-minutes", type=float, default=1)
+    args = parser.parse_args()
+
+    audio = load_call(args)
+    print(f"{len(audio) / 60000:.0f} min call, {audio.frame_rate} Hz, {audio.channels} channel(s), "
+          f"{len(audio.raw_data) / 2 ** 20:.0f} MB PCM")
+
+    elapsed_before, peak_before, count, samples_before = measure(before, cut(audio))
+
+    start = time.perf_counter()
+    converted = audio.set_channels(1).set_frame_rate(16000)
+    convert_once = time.perf_counter() - start
+    elapsed_after, peak_after, _, samples_after = measure(after, cut(converted))
+
+    print(f"Converting {count} chunks for the transcriber and acoustic analyzer")
+    print(f"  before: {elapsed_before:6.2f} s  peak {peak_before / 2 ** 20:6.1f} MB")
+    print(f"  after:  {elapsed_after:6.2f} s  peak {peak_after / 2 ** 20:6.1f} MB  "
+          f"(+ {convert_once:.2f} s converting the file once)")
+    print(f"  Whisper input: {samples_before} vs {samples_after} samples")
+
+    native, mono = split_seconds(audio, args.split_minutes), split_seconds(converted, args.split_minutes)
+    print("split_on_silence, per minute of audio")
+    print(f"  native {native:5.2f} s, 16 kHz mono {mono:5.2f} s "
+          f"(~{(native - mono) * len(audio) / 60000:.0f} s saved on this call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: LSTMAudioAnalyzer feature extraction with a shared SpectralContext
+vs. the original per-feature librosa calls, on a synthetic 10-minute call.
+
+The original path computes the STFT separately for mfcc, two piptracks,
+spectral_centroid and beat_track; the context computes it once. Both paths
+must produce the same feature values, on the synthetic call and on a
+non-periodic signal (random tone bursts), whose tempo depends on how the
+onset envelope is aggregated across mel bands.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_spectral_context.py --minutes 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import LSTMAudioAnalyzer
+from analyzer.audio_analyzer.spectral_context import SpectralContext
+
+
+def synthetic_call(seconds, sr=16000, seed=0):
+    """Voiced tone with a drifting pitch, gated into speech and pauses, plus noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    f0 = 140 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = 0.3 * np.sin(phase) + 0.15 * np.sin(2 * phase)
+    y *= (np.sin(2 * np.pi * 0.8 * t) > -0.3)
+    return (y + 0.01 * rng.normal(size=len(t))).astype(np.float32)
+
+
+def tone_bursts(seconds=30, sr=16000, seed=4):
+    """Tones of random pitch and length at random times: no steady beat to lock onto"""
+    rng = np.random.default_rng(seed)
+    y = np.zeros(int(seconds * sr))
+    for start in rng.integers(0, len(y), 3 * int(seconds)):
+        length = len(y[start:start + int(rng.uniform(0.05, 0.5) * sr)])
+        y[start:start + length] += rng.uniform(0.1, 0.5) * np.sin(2 * np.pi * rng.uniform(100, 3000) * np.arange(length) / sr)
+    return (y + 0.01 * rng.normal(size=len(y))).astype(np.float32)
+
+
+def original_spectral_calls(y, sr):
+    """The librosa calls the analyzer made before SpectralContext"""
+    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+    pitches_a, magnitudes = librosa.piptrack(y=y, sr=sr)
+    centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
+    rms = librosa.feature.rms(y=y)[0]
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+    pitches_b, _ = librosa.piptrack(y=y, sr=sr)
+    return mfccs, pitches_a, magnitudes, centroid, rms, tempo, pitches_b
+
+
+def context_spectral_calls(y, sr):
+    """The same values through one shared context"""
+    context = SpectralContext(y, sr)
+    pitches, magnitudes = context.piptrack()
+    tempo, _ = librosa.beat.beat_track(onset_envelope=context.onset_envelope(), sr=sr)
+    return (context.mfcc(13), pitches, magnitudes, context.spectral_centroid(), context.rms(),
+            tempo, context.piptrack()[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=10)
+    args = parser.parse_args()
+
+    sr = 16000
+    y = synthetic_call(args.minutes * 60, sr)
+    analyzer = LSTMAudioAnalyzer()
+
+    start = time.perf_counter()
+    original = original_spectral_calls(y, sr)
+    original_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    shared = context_spectral_calls(y, sr)
+    shared_time = time.perf_counter() - start
+
+    # Parity on the timed call, and on a signal without a steady beat
+    bursts = tone_bursts(sr=sr)
+    for signal, outputs in (("synthetic call", (original, shared)),
+                            ("tone bursts", (original_spectral_calls(bursts, sr), context_spectral_calls(bursts, sr)))):
+        names = ("mfcc", "pitches", "magnitudes", "centroid", "rms", "tempo", "pitches (2nd)")
+        for name, a, b in zip(names, *outputs):
+            if not np.allclose(a, b, rtol=1e-4, atol=1e-4):
+                print(f"MISMATCH in {name} ({signal}): max diff {np.max(np.abs(np.asarray(a) - np.asarray(b)))}")
+                sys.exit(1)
+
+    # End-to-end feature extraction as analyze_audio runs it
+    start = time.perf_counter()
+    context = SpectralContext(y, sr)
+    analyzer._extract_audio_features(y, sr, context)
+    analyzer._analyze_acoustic_patterns(y, sr, context)
+    features_time = time.perf_counter() - start
+
+    print(f"Signal: {args.minutes:g} min at {sr} Hz")
+    print(f"  original spectral calls : {original_time:7.2f} s")
+    print(f"  shared SpectralContext  : {shared_time:7.2f} s  ({original_time / shared_time:.2f}x)")
+    print(f"  full feature extraction : {features_time:7.2f} s (with context)")
+    print("Outputs match")
+
+
+if __name__ == "__main__":
+    main()
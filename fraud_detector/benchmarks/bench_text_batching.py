@@ -0,0 +1,74 @@
+"""
+Benchmark: batched BERT inference vs. the one-text-at-a-time loop.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_text_batching.py --texts 256 --batch-size 16
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import BERTTextAnalyzer
+
+SENTENCES = [
+    "This is the IRS calling about your unpaid taxes.",
+    "You must pay immediately or you will be arrested.",
+    "Hi, just checking if we are still on for dinner tonight.",
+    "Please confirm your social security number and OTP.",
+    "Your bank account will be closed unless you act now.",
+    "Congratulations, you have won a free lottery prize!",
+    "Can you pick up some milk on the way home?",
+    "Do not tell anyone about this call, it is confidential.",
+]
+
+
+def make_texts(count, seed=0):
+    """Build transcripts of varying length from the sentence pool"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(SENTENCES, k=rng.randint(1, 40))) for _ in range(count)]
+
+
+def encode_one_at_a_time(analyzer, texts):
+    """The original per-call path: tokenize and run BERT for each text separately"""
+    for text in texts:
+        inputs = analyzer.tokenizer(text, return_tensors='pt', truncation=True, max_length=512)
+        with torch.no_grad():
+            analyzer.model(**inputs).last_hidden_state.mean(dim=1).numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    analyzer = BERTTextAnalyzer()
+    texts = make_texts(args.texts)
+
+    # Warm up both paths so lazy initialisation is not timed
+    encode_one_at_a_time(analyzer, texts[:2])
+    analyzer._run_bert(texts[:2], args.batch_size)
+
+    start = time.perf_counter()
+    encode_one_at_a_time(analyzer, texts)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyzer._run_bert(texts, args.batch_size)
+    batch_time = time.perf_counter() - start
+
+    print(f"Texts: {len(texts)}  batch size: {args.batch_size}")
+    print(f"  per-text loop : {len(texts) / loop_time:8.1f} texts/sec")
+    print(f"  batched       : {len(texts) / batch_time:8.1f} texts/sec")
+    print(f"  speedup       : {loop_time / batch_time:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: int8 dynamic-quantized BERT backend vs. fp32.
+
+Each backend runs in its own process so peak RSS is measured in isolation.
+Reports fraud_score parity, risk-level agreement, latency and peak RSS.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_text_quantization.py --texts 64
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_text_batching import make_texts
+
+
+def run_backend(backend, texts, batch_size):
+    """Score texts with one backend and report timings and peak RSS"""
+    import torch
+    from advanced_models import BERTTextAnalyzer
+
+    torch.set_num_threads(max(1, os.cpu_count() or 1))
+    analyzer = BERTTextAnalyzer(cache_max_bytes=0, backend=backend)
+    analyzer.analyze_texts(texts[:2], batch_size=batch_size)
+
+    start = time.perf_counter()
+    single = [analyzer.analyze_text(text) for text in texts]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyzer.analyze_texts(texts, batch_size=batch_size)
+    batch_time = time.perf_counter() - start
+
+    return {
+        'scores': [result['fraud_score'] for result in single],
+        'risk_levels': [result['risk_level'] for result in single],
+        'single_ms': single_time / len(texts) * 1000,
+        'batch_texts_per_sec': len(texts) / batch_time,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="maximum allowed |fraud_score| difference")
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts, seed=1)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in ("fp32", "int8"):
+        with context.Pool(1) as pool:
+            results[backend] = pool.apply(run_backend, (backend, texts, args.batch_size))
+
+    fp32, int8 = results["fp32"], results["int8"]
+    diff = np.abs(np.array(fp32['scores']) - np.array(int8['scores']))
+    agreement = np.mean([a == b for a, b in zip(fp32['risk_levels'], int8['risk_levels'])])
+
+    print(f"{'backend':<8}{'ms/text':>10}{'batched texts/s':>18}{'peak RSS MB':>14}")
+    for backend, result in results.items():
+        print(f"{backend:<8}{result['single_ms']:>10.1f}{result['batch_texts_per_sec']:>18.1f}"
+              f"{result['peak_rss_mb']:>14.0f}")
+    print(f"\nfraud_score |fp32 - int8|: max {diff.max():.4f}  mean {diff.mean():.4f}")
+    print(f"risk_level agreement: {agreement:.1%}")
+
+    if diff.max() > args.tolerance:
+        print(f"PARITY FAILED: max difference exceeds {args.tolerance}")
+        sys.exit(1)
+    print("Parity OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: sliding-window encoding cost vs. transcript length.
+
+Encoding time per call should grow linearly with the number of tokens,
+since each window costs the same and window count grows with length.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_text_windowing.py --max-words 16000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import BERTTextAnalyzer
+from bench_text_batching import SENTENCES
+
+
+def make_transcript(words):
+    """Repeat the sentence pool until the transcript has roughly `words` words"""
+    pool = " ".join(SENTENCES).split()
+    return " ".join(pool[i % len(pool)] for i in range(words))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-words", type=int, default=16000)
+    parser.add_argument("--max-windows-per-batch", type=int, default=8)
+    args = parser.parse_args()
+
+    analyzer = BERTTextAnalyzer(cache_max_bytes=0, sliding_window=True,
+                                max_windows_per_batch=args.max_windows_per_batch)
+    analyzer._run_bert([make_transcript(100)], batch_size=1)
+
+    print(f"{'words':>8}{'tokens':>8}{'windows':>9}{'seconds':>10}{'ms/token':>10}")
+    words = 500
+    while words <= args.max_words:
+        text = make_transcript(words)
+        tokens = analyzer.tokenizer(text, add_special_tokens=False)['input_ids']
+        windows = len(analyzer._split_windows(tokens))
+
+        start = time.perf_counter()
+        analyzer._run_bert([text], batch_size=args.max_windows_per_batch)
+        elapsed = time.perf_counter() - start
+
+        print(f"{words:>8}{len(tokens):>8}{windows:>9}{elapsed:>10.2f}{elapsed / len(tokens) * 1000:>10.3f}")
+        words *= 2
+
+
+if __name__ == "__main__":
+    main()
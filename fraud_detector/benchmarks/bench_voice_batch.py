@@ -0,0 +1,90 @@
+"""
+Benchmark: enrolling and matching a case archive of clips one at a time (as
+the single-clip /voice/match/ endpoint does: write, decode, extract, insert)
+vs. the batch endpoints' path (decode from memory in a process pool, then one
+vectorized insert or match per batch).
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_voice_batch.py --clips 500 --workers 4
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from advanced_models import VoiceFingerprinting, voiceprint_from_bytes
+from bench_spectral_context import synthetic_call
+
+
+def make_clips(count, seconds):
+    clips = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        sf.write(buffer, synthetic_call(seconds, seed=i) * (0.5 + (i % 7) / 10), 16000, format="WAV")
+        clips.append((f"clip_{i}.wav", buffer.getvalue()))
+    return clips
+
+
+def one_at_a_time(clips, store):
+    matches = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, data in clips:
+            path = os.path.join(tmp, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            voiceprint = store.create_voiceprint(path)
+            os.remove(path)
+            store.store_voiceprint(os.path.splitext(name)[0], voiceprint)
+            matches.append(store.match_voiceprint(voiceprint))
+    return matches
+
+
+def batched(clips, store, pool, batch_size):
+    matches = []
+    for start in range(0, len(clips), batch_size):
+        batch = clips[start:start + batch_size]
+        voiceprints = np.stack(list(pool.map(voiceprint_from_bytes, [d for _, d in batch], [n for n, _ in batch])))
+        store.store_voiceprints([os.path.splitext(name)[0] for name, _ in batch], voiceprints)
+        matches.extend(store.match_voiceprints(voiceprints))
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clips", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    clips = make_clips(args.clips, args.seconds)
+
+    start = time.perf_counter()
+    single = one_at_a_time(clips, VoiceFingerprinting(index="exact"))
+    single_time = time.perf_counter() - start
+
+    with ProcessPoolExecutor(args.workers) as pool:
+        list(pool.map(abs, range(args.workers)))  # start the workers before timing
+        start = time.perf_counter()
+        batch = batched(clips, VoiceFingerprinting(index="exact"), pool, args.batch_size)
+        batch_time = time.perf_counter() - start
+
+    agree = np.mean([(a or {}).get("voice_id") == (b[0]["voice_id"] if b else None) for a, b in zip(single, batch)])
+    print(f"{args.clips} clips of {args.seconds:g} s, enroll + match")
+    print(f"  one at a time          : {single_time:6.2f} s ({args.clips / single_time:6.1f} clips/s)")
+    print(f"  pool x{args.workers} + vectorized : {batch_time:6.2f} s ({args.clips / batch_time:6.1f} clips/s)")
+    print(f"  same best match for {agree:.0%} of clips")
+
+
+if __name__ == "__main__":
+    main()
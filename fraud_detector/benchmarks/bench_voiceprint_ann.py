@@ -0,0 +1,72 @@
+"""
+Benchmark: recall vs. queries per second of the VoiceFingerprinting IVF index
+at different n_probe settings, against exact brute-force search.
+
+Recall@k is the fraction of the exact top-k rows that the index also returns.
+Voiceprints are drawn around a set of random "speaker group" centres, as real
+MFCC voiceprints cluster; pass --spread 10 for near-uniform vectors.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_voiceprint_ann.py --size 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import VoiceFingerprinting
+
+
+def clustered_voiceprints(n, dim, groups, spread, rng):
+    centres = rng.normal(size=(groups, dim))
+    vectors = centres[rng.integers(0, groups, n)] + spread * rng.normal(size=(n, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--groups", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=0.3)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = VoiceFingerprinting.DIM
+    vectors = clustered_voiceprints(args.size, dim, args.groups, args.spread, rng)
+    ids = [f"voice_{i}" for i in range(args.size)]
+
+    store = VoiceFingerprinting(index="ivf", ann_min_size=min(100000, args.size))
+    start = time.perf_counter()
+    store.store_voiceprints(ids, vectors)
+    print(f"{args.size} voiceprints, enrolled and indexed in {time.perf_counter() - start:.1f} s "
+          f"({store._ivf.n_lists} cells)")
+
+    queries = vectors[rng.integers(0, args.size, args.queries)] \
+        + 0.05 * rng.normal(size=(args.queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    def run(**kwargs):
+        start = time.perf_counter()
+        results = [store._search(q, args.top_k, **kwargs)[1] for q in queries]
+        return results, args.queries / (time.perf_counter() - start)
+
+    exact, exact_qps = run(exact=True)
+    print(f"{'search':>12} {'recall@{}'.format(args.top_k):>10} {'QPS':>9} {'speedup':>8}")
+    print(f"{'exact':>12} {1.0:10.3f} {exact_qps:9.0f} {1.0:7.1f}x")
+    for n_probe in args.n_probe:
+        approx, qps = run(n_probe=n_probe)
+        recall = np.mean([len(np.intersect1d(a, e)) / len(e) for a, e in zip(approx, exact)])
+        print(f"{'n_probe=' + str(n_probe):>12} {recall:10.3f} {qps:9.0f} {qps / exact_qps:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
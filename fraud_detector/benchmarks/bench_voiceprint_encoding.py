@@ -0,0 +1,78 @@
+"""
+Benchmark: memory, latency and match accuracy of float32, float16 and int8
+voiceprint encodings in VoiceFingerprinting.
+
+Accuracy is measured against the float32 store with exact search:
+  - top-1: fraction of queries whose best match is unchanged
+  - recall@k: overlap of the top-k rows
+  - decision: fraction of queries whose match/no-match outcome at the
+    similarity threshold is unchanged
+  - max |error|: largest similarity error over the returned top-k
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_voiceprint_encoding.py --size 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from advanced_models import VoiceFingerprinting
+from bench_voiceprint_ann import clustered_voiceprints
+
+ENCODINGS = ("float32", "float16", "int8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.3,
+                        help="query noise; around 0.3 puts many similarities near the 0.85 threshold")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = VoiceFingerprinting.DIM
+    vectors = clustered_voiceprints(args.size, dim, 2000, 0.3, rng)
+    ids = [f"voice_{i}" for i in range(args.size)]
+    queries = vectors[rng.integers(0, args.size, args.queries)] \
+        + args.noise * rng.normal(size=(args.queries, dim)).astype(np.float32) / np.sqrt(dim)
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    results = {}
+    print(f"{args.size} voiceprints, {args.queries} queries, exact search")
+    print(f"{'encoding':>9} {'rows MB/1M':>11} {'match (ms)':>11} {'top-1':>7} "
+          f"{'recall@{}'.format(args.top_k):>10} {'decision':>9} {'max |error|':>12}")
+    for encoding in ENCODINGS:
+        store = VoiceFingerprinting(index="exact", encoding=encoding)
+        store.store_voiceprints(ids, vectors)
+        start = time.perf_counter()
+        results[encoding] = [store._search(q, args.top_k)[1:] for q in queries]
+        elapsed = (time.perf_counter() - start) / args.queries
+
+        reference = results["float32"]
+        top1 = np.mean([r[0][0] == e[0][0] for r, e in zip(results[encoding], reference)])
+        recall = np.mean([len(np.intersect1d(r[0], e[0])) / len(e[0]) for r, e in zip(results[encoding], reference)])
+        threshold = store.similarity_threshold
+        decision = np.mean([(r[1][0] > threshold) == (e[1][0] > threshold)
+                            for r, e in zip(results[encoding], reference)])
+        exact_vectors = vectors
+        error = max(np.max(np.abs(r[1] - exact_vectors[r[0]] @ q)) for r, q in zip(results[encoding], queries))
+        per_million = store.store.nbytes / args.size * 1e6 / 2 ** 20
+        print(f"{encoding:>9} {per_million:11.1f} {elapsed * 1000:11.2f} {top1:7.3f} {recall:10.3f} "
+              f"{decision:9.3f} {error:12.5f}")
+
+    record_bytes = VoiceFingerprinting(index="exact").store.record_dtype.itemsize
+    print(f"Each row also has a {record_bytes}-byte log record ({record_bytes * 1e6 / 2 ** 20:.1f} MB per 1M) "
+          f"and its metadata JSON.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: VoiceFingerprinting matching against a contiguous float32 matrix
+(one matrix-vector product + argpartition) vs. a per-entry np.dot loop over a
+dict, for growing numbers of enrolled voiceprints.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_voiceprint_matching.py --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import VoiceFingerprinting
+
+
+def random_voiceprints(n, dim, rng):
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def loop_match(database, voiceprint, threshold):
+    """Per-entry loop over a dict of stored voiceprints, as before the matrix store"""
+    best_match, best_similarity = None, 0
+    for voice_id, entry in database.items():
+        similarity = np.dot(voiceprint, entry['voiceprint'])
+        if similarity > best_similarity and similarity > threshold:
+            best_similarity = similarity
+            best_match = voice_id
+    return best_match
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--loop-limit", type=int, default=100000,
+                        help="skip the dict loop above this many entries")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dim = VoiceFingerprinting.DIM
+
+    print(f"{'entries':>9} {'enroll (s)':>11} {'match (ms)':>11} {'top-{} (ms)'.format(args.top_k):>11} "
+          f"{'loop (ms)':>10} {'MB':>7}")
+    for size in args.sizes:
+        vectors = random_voiceprints(size, dim, rng)
+        ids = [f"voice_{i}" for i in range(size)]
+        store = VoiceFingerprinting()
+        start = time.perf_counter()
+        store.store_voiceprints(ids, vectors)
+        enroll_time = time.perf_counter() - start
+
+        # Queries are noisy copies of enrolled voices, so each has a true match
+        targets = rng.integers(0, size, args.queries)
+        queries = vectors[targets] + 0.05 * rng.normal(size=(args.queries, dim)).astype(np.float32)
+
+        start = time.perf_counter()
+        found = [store.match_voiceprint(q) for q in queries]
+        match_time = (time.perf_counter() - start) / args.queries
+        start = time.perf_counter()
+        for q in queries:
+            store.match_top_k(q, args.top_k)
+        top_k_time = (time.perf_counter() - start) / args.queries
+        hits = sum(m is not None and m['voice_id'] == ids[t] for m, t in zip(found, targets))
+
+        loop_cell = "-"
+        if size <= args.loop_limit:
+            database = {i: {'voiceprint': v} for i, v in zip(ids, vectors.astype(np.float64))}
+            loop_queries = queries[:5] / np.linalg.norm(queries[:5], axis=1, keepdims=True)
+            start = time.perf_counter()
+            loop_found = [loop_match(database, q, store.similarity_threshold) for q in loop_queries]
+            loop_cell = f"{(time.perf_counter() - start) / len(loop_queries) * 1000:.1f}"
+            assert loop_found == [m['voice_id'] if m else None for m in found[:5]]
+
+        megabytes = store.store.nbytes / 2 ** 20
+        print(f"{size:9d} {enroll_time:11.2f} {match_time * 1000:11.2f} {top_k_time * 1000:11.2f} "
+              f"{loop_cell:>10} {megabytes:7.1f}   ({hits}/{args.queries} true matches)")
+
+
+if __name__ == "__main__":
+    main()
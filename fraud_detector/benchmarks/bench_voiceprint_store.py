@@ -0,0 +1,109 @@
+"""
+Benchmark: cold start of the file-backed VoiceprintStore.
+
+Builds a store of N voiceprints on disk, then times opening it in fresh
+processes. The matrix and logs are memory-mapped rather than loaded, so open
+time should stay flat as N grows and reader processes share the mapped pages.
+Also reports the first exact match after opening, the memory it added to each
+reader (private vs. shared pages), and the cost of compaction.
+
+Run from the fraud_detector directory:
+    python benchmarks/bench_voiceprint_store.py --size 1000000 --readers 4
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import VoiceFingerprinting
+
+READER = """
+import os, sys, time
+import numpy as np
+sys.path.insert(0, {root!r})
+from advanced_models import VoiceFingerprinting
+
+def memory_kb():
+    private = shared = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean', 'Private_Dirty')):
+                private += int(line.split()[1])
+            elif line.startswith(('Shared_Clean', 'Shared_Dirty')):
+                shared += int(line.split()[1])
+    return private, shared
+
+before = memory_kb()
+start = time.perf_counter()
+store = VoiceFingerprinting(store_path={path!r}, read_only=True, index='exact')
+opened = time.perf_counter() - start
+query = np.random.default_rng(1).normal(size=20)
+start = time.perf_counter()
+store.match_top_k(query, 5)
+matched = time.perf_counter() - start
+after = memory_kb()
+print(opened, matched, len(store), after[0] - before[0], after[1] - before[1])
+"""
+
+
+def open_in_readers(path, readers):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = READER.format(root=root, path=path)
+    procs = [subprocess.Popen([sys.executable, "-W", "ignore", "-c", code], stdout=subprocess.PIPE, text=True)
+             for _ in range(readers)]
+    return [tuple(float(x) for x in p.communicate()[0].split()) for p in procs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as path:
+        writer = VoiceFingerprinting(store_path=path, index='exact')
+        start = time.perf_counter()
+        for first in range(0, args.size, args.batch):
+            count = min(args.batch, args.size - first)
+            writer.store_voiceprints([f"voice_{i}" for i in range(first, first + count)],
+                                     rng.normal(size=(count, 20)), [{"batch": first}] * count)
+        print(f"Enrolled {args.size} voiceprints in {time.perf_counter() - start:.1f} s "
+              f"({writer.store.matrix.nbytes / 2 ** 20:.0f} MB matrix)")
+
+        def report(label):
+            results = open_in_readers(path, args.readers)
+            opened = np.mean([r[0] for r in results]) * 1000
+            matched = np.mean([r[1] for r in results]) * 1000
+            private = np.mean([r[3] for r in results]) / 1024
+            shared = np.mean([r[4] for r in results]) / 1024
+            print(f"  {label:28s} open {opened:7.1f} ms  first match {matched:7.1f} ms  "
+                  f"{int(results[0][2])} live  private {private:6.0f} MB  shared {shared:6.0f} MB")
+
+        print(f"Cold start in {args.readers} reader processes:")
+        report("compacted")
+
+        # Re-enroll and delete 10% so the log carries a tail of tombstones
+        tail = args.size // 10
+        writer.compact_ratio = 1.0
+        writer.store_voiceprints([f"voice_{i}" for i in range(tail)], rng.normal(size=(tail, 20)))
+        for i in range(tail, tail + 1000):
+            writer.delete_voiceprint(f"voice_{i}")
+        report("with 10% tombstoned rows")
+
+        start = time.perf_counter()
+        writer.compact()
+        print(f"Compaction: {time.perf_counter() - start:.1f} s")
+        report("after compaction")
+
+
+if __name__ == "__main__":
+    main()
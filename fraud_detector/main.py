@@ -21,7 +21,8 @@ def main():
     transcriber = Transcriber(model_size="small", compute_type="int8")
 
     try:
-        audio_ingester = AudioIngester(AUDIO_FILE_PATH)
+        # Chunks go to Whisper, so convert the file to 16 kHz mono once up front
+        audio_ingester = AudioIngester(AUDIO_FILE_PATH, frame_rate=16000, channels=1)
         llm_verifier = LLMVerifier()
     except (FileNotFoundError, ConnectionError) as e:
         print(f"ERROR: {e}")
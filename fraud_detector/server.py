@@ -119,7 +119,8 @@ async def run_fraud_analysis_with_updates(job_id: str, file_path: str):
             return
 
         await manager.send_json(job_id, {"status": "initializing", "message": "File received. Starting analysis..."})
-        audio_ingester = AudioIngester(file_path)
+        # Chunks go to Whisper, so convert the file to 16 kHz mono once up front
+        audio_ingester = AudioIngester(file_path, frame_rate=16000, channels=1)
         audio_chunks = audio_ingester.get_audio_chunks()
         total_chunks = len(audio_chunks)
         await manager.send_json(job_id, {"status": "transcribing", "message": f"Found {total_chunks} speech chunks."})
@@ -0,0 +1,48 @@
+"""
+Regression tests for VoiceprintStore: a rejected batch must leave the store
+as it was, in memory and on disk.
+
+Run from the fraud_detector directory:
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advanced_models import VoiceFingerprinting
+
+
+@pytest.fixture(params=["memory", "disk"])
+def fingerprinting(request, tmp_path):
+    store_path = str(tmp_path) if request.param == "disk" else None
+    return VoiceFingerprinting(store_path=store_path, index="exact")
+
+
+def test_rejected_batch_leaves_store_unchanged(fingerprinting):
+    dim = fingerprinting.DIM
+    fingerprinting.store_voiceprints(["alice"], np.eye(dim)[:1], [{"name": "alice"}])
+
+    with pytest.raises(ValueError):
+        fingerprinting.store_voiceprints(["alice", "bob", "x" * 70], np.eye(dim)[1:4])
+
+    assert len(fingerprinting) == 1
+    assert fingerprinting.store.voice_ids() == ["alice"]
+    assert fingerprinting.get_voiceprint("bob") is None
+    alice = fingerprinting.get_voiceprint("alice")
+    assert np.allclose(alice["voiceprint"], np.eye(dim)[0])
+    assert alice["metadata"] == {"name": "alice"}
+
+    # The next enrollment gets its own vector and metadata, and alice keeps hers
+    fingerprinting.store_voiceprint("carol", np.eye(dim)[5], {"name": "carol"})
+    carol = fingerprinting.get_voiceprint("carol")
+    assert np.allclose(carol["voiceprint"], np.eye(dim)[5])
+    assert carol["metadata"] == {"name": "carol"}
+    assert np.allclose(fingerprinting.get_voiceprint("alice")["voiceprint"], np.eye(dim)[0])
+
+    assert fingerprinting.delete_voiceprint("alice")
+    assert fingerprinting.store.voice_ids() == ["carol"]